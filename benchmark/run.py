@@ -0,0 +1,367 @@
+"""Offline benchmark of discord.ext.flow. No bot token or network is needed.
+
+usage: python benchmark/run.py [--flows N] [--steps N] [--concurrency N] [--scenario NAME] [--json]
+       python benchmark/run.py --replay TRACE --model MODULE:FACTORY [--sessions N] [--speed X] [--json]
+"""
+
+from __future__ import annotations
+
+import json
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from asyncio import Semaphore, gather, run
+from importlib import import_module
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, NamedTuple, TypeAlias
+
+from discord import Client, Embed, Interaction
+from discord.ext.flow import (
+    Button,
+    Controller,
+    FlowMetrics,
+    Histogram,
+    InteractionRouter,
+    Message,
+    ModalConfig,
+    ModalController,
+    ModelBase,
+    Paginator,
+    Result,
+    TextInput,
+    paginator,
+)
+from discord.ext.flow.replay import load_trace, replay
+from discord.ext.flow.testing import FakeInteraction, FakeTransport, click, submit_modal, wait_for_view
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from discord.ext.flow import ViewConfig
+
+# transitions take microseconds to milliseconds without API latency.
+STEP_BUCKETS = tuple(0.00005 * 2**i for i in range(18))
+
+
+class Counter(ModelBase):
+    """Each click moves to a new model. measures Controller.invoke transitions."""
+
+    def __init__(self, count: int, steps: int) -> None:
+        self.count = count
+        self.steps = steps
+
+    def message(self) -> Message:
+        return Message(
+            embeds=[Embed(title='counter', description=str(self.count))],
+            items=(Button(label='+1', callback=self.increment), Button(label='stop', callback=self.stop)),
+            edit_original=True,
+            disable_items=True,
+        )
+
+    async def increment(self, interaction: Interaction[Client]) -> Result:
+        if self.count + 1 >= self.steps:
+            return await self.stop(interaction)
+        return Result.next_model(Counter(self.count + 1, self.steps))
+
+    async def stop(self, interaction: Interaction[Client]) -> Result:
+        await interaction.response.defer()
+        return Result.finish_flow()
+
+
+class Editor(ModelBase):
+    """Each click edits the same view. measures _View.set_result."""
+
+    def __init__(self, steps: int) -> None:
+        self.count = 0
+        self.steps = steps
+
+    def view_config(self) -> ViewConfig:
+        return {'reuse_items': True}
+
+    def message(self) -> Message:
+        return Message(
+            content=f'count: {self.count}',
+            items=(Button(label='+1', callback=self.increment),),
+            edit_original=True,
+        )
+
+    async def increment(self, interaction: Interaction[Client]) -> Result:
+        self.count += 1
+        if self.count >= self.steps:
+            await interaction.response.defer()
+            return Result.finish_flow()
+        return Result.send_message(self.message())
+
+
+class Pages(ModelBase):
+    """Each click moves to the next page. measures Paginator navigation."""
+
+    def __init__(self, steps: int) -> None:
+        self.steps = steps
+
+    @paginator
+    def message(self) -> Paginator[int]:
+        return Paginator(self.build, values=range(10 * (self.steps + 1)))
+
+    def build(self, values: tuple[int, ...], current: int, max_page: int) -> Message:
+        return Message(
+            embeds=[Embed(title=f'{current + 1}/{max_page}', description='\n'.join(map(str, values)))],
+            items=(Button(label='close', callback=self.close),),
+            edit_original=True,
+        )
+
+    async def close(self, interaction: Interaction[Client]) -> Result:
+        await interaction.response.defer()
+        return Result.finish_flow()
+
+
+class Form(ModelBase):
+    """Each click opens a modal and moves to a new model. measures ModalController.send_modal."""
+
+    def __init__(self, count: int, steps: int) -> None:
+        self.count = count
+        self.steps = steps
+        self.modal_controller = ModalController()
+
+    def message(self) -> Message:
+        return Message(content=str(self.count), items=(Button(label='edit', callback=self.edit),), edit_original=True)
+
+    def after_invoke(self) -> None:
+        self.modal_controller.stop()
+
+    async def edit(self, interaction: Interaction[Client]) -> Result:
+        result = await self.modal_controller.send_modal(
+            interaction, ModalConfig(title='edit'), (TextInput(label='value'),)
+        )
+        if self.count + 1 >= self.steps:
+            await result.interaction.response.defer()
+            return Result.finish_flow()
+        return Result.next_model(Form(int(result.texts[0]), self.steps), interaction=result.interaction)
+
+
+async def drive_counter(interaction: FakeInteraction, steps: int, step_latency: Histogram) -> None:
+    message = await wait_for_view(interaction)
+    for _ in range(steps):
+        view = message.view
+        start = perf_counter()
+        await click(message, 0)
+        if _ < steps - 1:
+            message = await wait_for_view(message, view)
+        step_latency.observe(perf_counter() - start)
+
+
+async def drive_editor(interaction: FakeInteraction, steps: int, step_latency: Histogram) -> None:
+    message = await wait_for_view(interaction)
+    for _ in range(steps):
+        start = perf_counter()
+        await click(message, 0)
+        step_latency.observe(perf_counter() - start)
+
+
+async def drive_pages(interaction: FakeInteraction, steps: int, step_latency: Histogram) -> None:
+    message = await wait_for_view(interaction)
+    # items are the close button and control buttons (first, previous, page, next, last).
+    for _ in range(steps):
+        start = perf_counter()
+        await click(message, 4)
+        step_latency.observe(perf_counter() - start)
+    await click(message, 0)
+
+
+async def drive_form(interaction: FakeInteraction, steps: int, step_latency: Histogram) -> None:
+    message = await wait_for_view(interaction)
+    for i in range(steps):
+        view = message.view
+        start = perf_counter()
+        opened = await click(message, 0, wait=False)
+        await submit_modal(opened, (str(i + 1),))
+        if i < steps - 1:
+            message = await wait_for_view(message, view)
+        step_latency.observe(perf_counter() - start)
+
+
+Driver: TypeAlias = 'Callable[[FakeInteraction, int, Histogram], Awaitable[None]]'
+
+SCENARIOS: dict[str, tuple[Callable[[int], ModelBase], Driver]] = {
+    'invoke': (lambda steps: Counter(0, steps), drive_counter),
+    'set_result': (Editor, drive_editor),
+    'paginator': (Pages, drive_pages),
+    'modal': (lambda steps: Form(0, steps), drive_form),
+}
+
+
+# traces of snapshots are not memory of flows.
+SNAPSHOT_FILTERS = (tracemalloc.Filter(inclusive=False, filename_pattern=tracemalloc.__file__),)
+
+
+class StepMemory(Histogram):
+    """Step latency histogram which also measures memory of each step. tracemalloc must be tracing.
+
+    Drivers observe latency at the end of each step, so a step spans from the previous observation.
+    tracemalloc does not count allocations, so each step reports the peak of bytes allocated above its start,
+    and bytes and blocks retained after it. Traces of tracemalloc itself are excluded from blocks.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.peak_bytes: list[int] = []
+        self.retained_bytes: list[int] = []
+        self.retained_blocks: list[int] = []
+        self._mark()
+
+    def _mark(self) -> None:
+        self._snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        self._start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def observe(self, value: float) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        super().observe(value)
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        self.peak_bytes.append(peak - self._start)
+        self.retained_bytes.append(current - self._start)
+        self.retained_blocks.append(sum(stat.count_diff for stat in snapshot.compare_to(self._snapshot, 'filename')))
+        self._mark()
+
+
+class Session(NamedTuple):
+    transport: FakeTransport
+    metrics: FlowMetrics
+    step_latency: Histogram
+    router: InteractionRouter | None
+
+
+async def run_flow(name: str, steps: int, session: Session) -> None:
+    factory, driver = SCENARIOS[name]
+    interaction = FakeInteraction(session.transport)
+    flow = Controller(factory(steps), metrics=session.metrics, router=session.router).invoke(interaction)
+    await gather(flow, driver(interaction, steps, session.step_latency))
+
+
+async def run_scenario(name: str, options: Namespace) -> dict[str, object]:
+    flows: int = options.flows
+    steps: int = options.steps
+    router = InteractionRouter() if options.router else None
+    session = Session(
+        FakeTransport(options.latency, record=False), FlowMetrics(STEP_BUCKETS), Histogram(STEP_BUCKETS), router
+    )
+    semaphore = Semaphore(options.concurrency)
+
+    async def limited() -> None:
+        async with semaphore:
+            await run_flow(name, steps, session)
+
+    start = perf_counter()
+    await gather(*(limited() for _ in range(flows)))
+    elapsed = perf_counter() - start
+
+    # memory is measured separately, because tracing allocations slows down everything.
+    tracemalloc.start()
+    memory = StepMemory()
+    await run_flow(name, steps, Session(FakeTransport(record=False), FlowMetrics(), memory, router))
+    tracemalloc.stop()
+    measured = max(1, len(memory.peak_bytes))
+
+    return {
+        'flows': flows,
+        'steps': steps,
+        'concurrency': options.concurrency,
+        'router': options.router,
+        'seconds': elapsed,
+        'flows_per_sec': flows / elapsed,
+        'transitions_per_sec': flows * steps / elapsed,
+        'api_calls': session.transport.call_count,
+        'step_latency': session.step_latency.to_dict(),
+        'peak_bytes_per_transition': sum(memory.peak_bytes) / measured,
+        'retained_bytes_per_transition': sum(memory.retained_bytes) / measured,
+        'retained_blocks_per_transition': sum(memory.retained_blocks) / measured,
+        'phases': session.metrics.export(),
+    }
+
+
+async def run_replay(options: Namespace) -> dict[str, object]:
+    module, _, attr = options.model.partition(':')
+    factory = getattr(import_module(module), attr)
+    report = await replay(
+        load_trace(options.replay), factory, speed=options.speed, sessions=options.sessions, latency=options.latency
+    )
+    return {
+        'sessions': report.sessions,
+        'events': report.events,
+        'diverged': report.diverged,
+        'seconds': report.seconds,
+        'events_per_sec': report.events / report.seconds,
+        'api_calls': report.api_calls,
+        'latency': report.latency.to_dict(),
+    }
+
+
+def print_replay(report: dict[str, Any]) -> None:
+    latency = report['latency']
+    print(f'[replay] {report["sessions"]} sessions, {report["diverged"]} diverged')
+    print(f'  events/sec       {report["events_per_sec"]:12.1f}')
+    print(f'  api calls        {report["api_calls"]:12d}')
+    print(
+        f'  latency          p50 {latency["p50"] * 1000:.2f}ms  p95 {latency["p95"] * 1000:.2f}ms  '
+        f'p99 {latency["p99"] * 1000:.2f}ms  max {latency["max"] * 1000:.2f}ms'
+    )
+
+
+def print_report(name: str, report: dict[str, Any]) -> None:
+    latency = report['step_latency']
+    print(
+        f'[{name}] {report["flows"]} flows x {report["steps"]} steps, concurrency {report["concurrency"]}'
+        + (', router' if report['router'] else '')
+    )
+    print(f'  flows/sec        {report["flows_per_sec"]:12.1f}')
+    print(f'  transitions/sec  {report["transitions_per_sec"]:12.1f}')
+    print(f'  api calls        {report["api_calls"]:12d}')
+    print(
+        f'  step latency     p50 {latency["p50"] * 1000:.2f}ms  p95 {latency["p95"] * 1000:.2f}ms  '
+        f'p99 {latency["p99"] * 1000:.2f}ms  max {latency["max"] * 1000:.2f}ms'
+    )
+    print(f'  peak alloc/transition {report["peak_bytes_per_transition"]:7.0f} B')
+    print(
+        f'  retained/transition {report["retained_bytes_per_transition"]:9.0f} B  '
+        f'{report["retained_blocks_per_transition"]:8.1f} blocks'
+    )
+    for model, phases in report['phases'].items():
+        for phase, histogram in phases.items():
+            print(f'    {model}.{phase:<14} n={histogram["count"]:<7} p95 {histogram["p95"] * 1000:.2f}ms')
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--flows', type=int, default=200, help='number of flows per scenario.')
+    parser.add_argument('--steps', type=int, default=10, help='number of transitions per flow.')
+    parser.add_argument('--concurrency', type=int, default=50, help='number of flows running at once.')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds of fake API latency per call.')
+    parser.add_argument('--router', action='store_true', help='dispatch interactions by InteractionRouter.')
+    parser.add_argument('--scenario', choices=(*SCENARIOS, 'all'), default='all')
+    parser.add_argument('--json', action='store_true', help='print reports as JSON.')
+    parser.add_argument('--replay', metavar='TRACE', help='replay trace recorded by TraceRecorder.')
+    parser.add_argument('--model', metavar='MODULE:FACTORY', help='factory of initial model to replay against.')
+    parser.add_argument('--sessions', type=int, help='number of replayed sessions. Defaults to once per trace.')
+    parser.add_argument('--speed', type=float, default=1.0, help='speed of replay relative to the recording.')
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        if args.model is None:
+            parser.error('--replay requires --model.')
+        replayed = run(run_replay(args))
+        if args.json:
+            print(json.dumps(replayed, indent=2))
+        else:
+            print_replay(replayed)
+        return
+
+    names = tuple(SCENARIOS) if args.scenario == 'all' else (args.scenario,)
+    reports = {name: run(run_scenario(name, args)) for name in names}
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    for name, report in reports.items():
+        print_report(name, report)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,20 @@ from __future__ import annotations
 __version__ = '0.1.6'
 
 from .controller import *
+from .deletion import *
+from .executor import *
+from .metrics import *
 from .modal import *
 from .model import *
+from .observer import *
 from .pages import *
+from .persistent import *
+from .registry import *
 from .result import *
+from .router import *
+from .store import *
+from .tracing import *
+from .view import *
 
 __all__ = (
     'Message',
@@ -19,6 +29,8 @@ __all__ = (
     'ChannelSelect',
     'ModelBase',
     'Controller',
+    'setup_persistent',
+    'PersistentModel',
     'TextInput',
     'ModalConfig',
     'ModalResult',
@@ -26,5 +38,29 @@ __all__ = (
     'send_modal',
     'Paginator',
     'paginator',
+    'PageCache',
     'Result',
+    'FlowMetrics',
+    'Histogram',
+    'AckTracker',
+    'default_ack_tracker',
+    'Tracer',
+    'OpenTelemetryTracer',
+    'FlowStore',
+    'MemoryFlowStore',
+    'SQLiteFlowStore',
+    'SnapshotFlowStore',
+    'FlowRegistry',
+    'default_registry',
+    'InteractionRouter',
+    'register_item',
+    'DeletionScheduler',
+    'default_scheduler',
+    'ExecutionPolicy',
+    'execute_in',
+    'FlowExecutor',
+    'default_executor',
+    'FlowObserver',
+    'add_observer',
+    'remove_observer',
 )
@@ -1,22 +1,49 @@
 from __future__ import annotations
 
+from asyncio import Task, create_task, gather
+from contextlib import AbstractContextManager, nullcontext
+from secrets import token_urlsafe
 from typing import TYPE_CHECKING
 
+from discord import Interaction, ui
 from discord.utils import maybe_coroutine
 
-from .util import send_helper
-from .view import _View
+from .executor import default_executor
+from .model import Button, Link
+from .observer import hooks
+from .persistent import (
+    CUSTOM_ID_TEMPLATE,
+    STORE_KEY_PREFIX,
+    PersistentModel,
+    encode_items,
+    get_model_class,
+    restoring_flow,
+)
+from .registry import default_registry
+from .result import _ResultTypeEnum
+from .store import FlowStore, get_store
+from .util import _AutoDefer, _PayloadCache, send_helper
+from .view import _RoutedView, _View
 
 if TYPE_CHECKING:
-    from typing import Self
+    from collections.abc import Iterable, Mapping
+    from re import Match
+    from typing import Any, Self, TypeAlias
 
-    from discord import Client, Interaction
+    from discord import Client
     from discord.abc import Messageable
 
-    from .model import ModelBase
+    from .metrics import FlowMetrics
+    from .model import ItemType, Message, ModelBase, ViewConfig
+    from .registry import FlowRegistry
+    from .result import Result
+    from .router import InteractionRouter
+    from .tracing import Tracer
     from .util import _Editable
 
-__all__ = ('Controller',)
+    _StepResult: TypeAlias = tuple[ModelBase, Interaction[Client], _Editable, Task[Message] | None]
+
+__all__ = ('Controller', 'setup_persistent')
 
 
 class Controller:
@@ -26,12 +53,59 @@ class Controller:
 
     Args:
         initial_model (ModelBase): Initial model. This model will be used first.
+        store (FlowStore | None, optional): Store to save models of this flow. If set, models are saved after
+            sending each message and after each callback, and the flow does not stay in memory. When an item is
+            clicked, the model is loaded and its message is rendered again to find the callback, so state shown by
+            `Result.send_message` must be kept on the model. Models must be picklable if the store pickles them.
+            You should call `setup_persistent` once before using store. Defaults to None.
+        flow_id (str | None, optional): ID of this flow in store. Defaults to random string.
+        metrics (FlowMetrics | None, optional): Metrics to record durations of each phase. Defaults to None.
+        tracer (Tracer | None, optional): Tracer to record spans of flow, steps, callbacks and sending messages.
+            Defaults to None.
+        registry (FlowRegistry | None, optional): Registry of live flows. The flow is registered while invoked,
+            and rejected or queued if caps of registry are reached. Defaults to `default_registry`.
+        router (InteractionRouter | None, optional): Router to dispatch interactions of this flow. If set, views
+            are not stored in discord.py ViewStore. Defaults to None.
+        auto_defer (float | None, optional): Seconds to wait before deferring the interaction automatically while
+            building a message or running a callback, so that slow steps do not lose the interaction.
+            Only interactions of components and modals sent from components are deferred, as update of the
+            message. After deferring, messages are sent by editing the original response or by followup.
+            Callbacks which respond by themselves should respond before this. Defaults to None (disabled).
     """
 
     model: ModelBase
+    store: FlowStore | None
+    flow_id: str
+    metrics: FlowMetrics | None
+    tracer: Tracer | None
+    registry: FlowRegistry
+    router: InteractionRouter | None
+    auto_defer: float | None
 
-    def __init__(self, initial_model: ModelBase) -> None:
+    def __init__(  # noqa: PLR0913
+        self,
+        initial_model: ModelBase,
+        store: FlowStore | None = None,
+        *,
+        flow_id: str | None = None,
+        metrics: FlowMetrics | None = None,
+        tracer: Tracer | None = None,
+        registry: FlowRegistry | None = None,
+        router: InteractionRouter | None = None,
+        auto_defer: float | None = None,
+    ) -> None:
         self.model = initial_model
+        self.store = store
+        self.flow_id = token_urlsafe(12) if flow_id is None else flow_id
+        self.metrics = metrics
+        self.tracer = tracer
+        self.registry = default_registry if registry is None else registry
+        self.router = router
+        self.auto_defer = auto_defer
+        self._live: tuple[ModelBase, _View, _Editable] | None = None
+        # payloads sent to messages of this flow, for `diff_edits`.
+        self._payloads = _PayloadCache()
+        self._closed = False
 
     def copy(self) -> Self:
         """Returns a copy of this controller.
@@ -39,7 +113,15 @@ class Controller:
         Returns:
             Controller: Copied controller.
         """
-        return self.__class__(self.model)
+        return self.__class__(
+            self.model,
+            self.store,
+            metrics=self.metrics,
+            tracer=self.tracer,
+            registry=self.registry,
+            router=self.router,
+            auto_defer=self.auto_defer,
+        )
 
     async def invoke(self, messageable: Messageable | Interaction[Client], message: _Editable | None = None) -> None:
         """Invoke flow.
@@ -48,35 +130,335 @@ class Controller:
             messageable (Messageable | Interaction): Messageable or interaction to send first message.
             message (discord.Message | None): The first target for editing if edit_original is True. Defaults to None.
         """
+        if isinstance(messageable, Interaction):
+            guild_id, user_id = messageable.guild_id, messageable.user.id
+        else:
+            guild = getattr(messageable, 'guild', None)
+            guild_id, user_id = getattr(guild, 'id', None), None
+        if (token := await self.registry.acquire(self, guild_id, user_id)) is None:
+            await send_helper(messageable, self.registry.busy_message, None, message, tracer=self.tracer)
+            return
+
         model_or_msg: ModelBase = self.model
-        while True:
-            if (ret := await self._send(model_or_msg, messageable, message)) is None:
-                break
-            model_or_msg, messageable, message = ret
+        prepared: Task[Message] | None = None
+        failed = False
+        try:
+            # the registry is released even if an observer raises.
+            for hook in hooks.flow_started:
+                hook(self)
+            with self._span('flow', {'flow.id': self.flow_id, 'flow.model': type(self.model).__qualname__}):
+                while True:
+                    if (ret := await self._send(model_or_msg, messageable, message, prepared)) is None:
+                        break
+                    model_or_msg, messageable, message, prepared = ret
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if prepared is not None:
+                prepared.cancel()
+            await self.registry.release(token)
+            self._flow_finished(failed=failed)
+
+    def _flow_finished(self, *, failed: bool) -> None:
+        errors: list[Exception] = []
+        for hook in hooks.flow_finished:
+            try:
+                hook(self)
+            except Exception as e:  # noqa: BLE001
+                errors.append(e)
+        # errors of observers do not replace the error of the flow.
+        if errors and not failed:
+            raise errors[0]
 
     async def _send(
         self,
         model: ModelBase,
         messageable: Messageable | Interaction[Client],
         edit_target: _Editable | None,
-    ) -> tuple[ModelBase, Interaction[Client], _Editable] | None:
-        await maybe_coroutine(model.before_invoke)
-        msg = await maybe_coroutine(model.message)
+        prepared: Task[Message] | None = None,
+    ) -> _StepResult | None:
+        with self._span('flow.step', {'flow.id': self.flow_id, 'flow.model': type(model).__qualname__}) as span:
+            return await self._step(model, messageable, edit_target, prepared, span)
+
+    async def _prepare(self, model: ModelBase) -> Message:
+        with self._measure(model, 'before_invoke'):
+            await maybe_coroutine(model.before_invoke)
+        with self._measure(model, 'message'):
+            return await default_executor.run(model.message)
+
+    async def _warm(self, model: ModelBase) -> dict[int, tuple[ModelBase, Task[Message]]]:
+        successors = await maybe_coroutine(model.successors)
+        warmed: dict[int, tuple[ModelBase, Task[Message]]] = {}
+        for successor in successors:
+            task = create_task(self._prepare(successor))
+            task.add_done_callback(_retrieve_exception)
+            # keyed by id, because models may define __eq__ or be unhashable.
+            warmed[id(successor)] = (successor, task)
+        return warmed
+
+    async def _step(
+        self,
+        model: ModelBase,
+        messageable: Messageable | Interaction[Client],
+        edit_target: _Editable | None,
+        prepared: Task[Message] | None,
+        span: object,
+    ) -> _StepResult | None:
+        async with _AutoDefer(messageable, self.auto_defer):
+            msg = await (self._prepare(model) if prepared is None else prepared)
+        for hook in hooks.step_rendered:
+            hook(self, model, msg)
 
         if msg.items is None:
-            await send_helper(messageable, msg, None, edit_target)
-            await maybe_coroutine(model.after_invoke)
+            with self._measure(model, 'send_helper'):
+                await send_helper(messageable, msg, None, edit_target, tracer=self.tracer)
+            if self.store is not None:
+                await self.store.delete(self.flow_id)
+            await self._after_invoke(model)
+            return None
+
+        if self.store is not None or isinstance(model, PersistentModel):
+            await self._send_persistent(model, msg, messageable, edit_target)
+            await self._after_invoke(model)
             return None
 
-        view = _View(await maybe_coroutine(model.view_config), msg.items)
-        message = await send_helper(messageable, msg, view, edit_target)
+        with self._measure(model, 'view_config'):
+            config = await maybe_coroutine(model.view_config)
+        view = (
+            _View(config, msg.items, model=model, controller=self, span=span)
+            if self.router is None
+            else _RoutedView(config, msg.items, router=self.router, model=model, controller=self, span=span)
+        )
+        if self._closed:
+            # the flow is stopped while preparing this message. send it as the last message.
+            view.disable_items()
+            view.stop()
+        with self._measure(model, 'send_helper'):
+            message = await send_helper(messageable, msg, view, edit_target, tracer=self.tracer)
+        view.bind_message(message)
+
+        self._live = (model, view, message)
+        warmed: dict[int, tuple[ModelBase, Task[Message]]] = {}
+        try:
+            with self._measure(model, 'wait'):
+                warmed = await self._warm(model)
+                await view.wait()
+            next_prepared = None if view.result is None else self._prepare_next(view.result[0], config, warmed)
+        finally:
+            self._live = None
+            # successors which are not reused must not keep running after this step, even if the flow ends.
+            await _cancel_all(task for _, task in warmed.values())
+
+        try:
+            if msg.disable_items:
+                await self._disable_items(model, view, message)
+
+            await self._after_invoke(model)
+        except BaseException:
+            if next_prepared is not None:
+                next_prepared.cancel()
+            raise
 
-        await view.wait()
-        if msg.disable_items:
-            for child in view.children:
-                child.disabled = True  # type: ignore[reportGeneralTypeIssues, attr-defined]
+        return None if view.result is None else (*view.result, message, next_prepared)
+
+    def _prepare_next(
+        self, model: ModelBase, config: ViewConfig, warmed: dict[int, tuple[ModelBase, Task[Message]]]
+    ) -> Task[Message] | None:
+        prepared = None
+        if (entry := warmed.get(id(model))) is not None and entry[0] is model:
+            # reused. other successors are cancelled by the caller.
+            del warmed[id(model)]
+            prepared = entry[1]
+        elif config.get('prepare_next', False):
+            prepared = create_task(self._prepare(model))
+        return prepared
+
+    async def _disable_items(self, model: ModelBase, view: _View, message: _Editable) -> None:
+        if view.items_disabled:
+            return
+        with self._measure(model, 'disable_items'):
+            view.disable_items()
             await message.edit(view=view)
 
-        await maybe_coroutine(model.after_invoke)
+    async def wait_idle(self) -> None:
+        """Wait until no callback of the current message is running."""
+        if self._live is not None:
+            await self._live[1].wait_idle()
+
+    async def stop(self) -> None:
+        """Stop this flow. Items of the current message are disabled, and the flow finishes after this.
+
+        If the next message is being prepared, it is sent with disabled items as the last message.
+        """
+        self._closed = True
+        if (live := self._live) is None:
+            return
+        model, view, message = live
+        try:
+            await self._disable_items(model, view, message)
+        finally:
+            view.stop()
+
+    def _measure(self, model: ModelBase, phase: str) -> AbstractContextManager[None]:
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.measure(model, phase)
+
+    def _span(self, name: str, attributes: Mapping[str, str]) -> AbstractContextManager[object]:
+        if self.tracer is None:
+            return nullcontext()
+        return self.tracer.start_span(name, attributes)
+
+    async def _after_invoke(self, model: ModelBase) -> None:
+        with self._measure(model, 'after_invoke'):
+            await maybe_coroutine(model.after_invoke)
+
+    async def _send_persistent(
+        self,
+        model: ModelBase,
+        msg: Message,
+        messageable: Messageable | Interaction[Client],
+        edit_target: _Editable | None,
+    ) -> None:
+        assert msg.items is not None
+        if self.store is not None:
+            await self.store.save(self.flow_id, model)
+            key, state = STORE_KEY_PREFIX + self.store.name, self.flow_id
+        else:
+            assert isinstance(model, PersistentModel)
+            key, state = model.__flow_key__, await maybe_coroutine(model.dump_state)
+
+        with self._measure(model, 'view_config'):
+            config = await maybe_coroutine(model.view_config)
+        view = _View(config, encode_items(key, state, msg.items))
+        # stopped view is not stored by discord.py. interactions are dispatched by _PersistentItem.
+        view.stop()
+        with self._measure(model, 'send_helper'):
+            await send_helper(messageable, msg, view, edit_target, tracer=self.tracer)
+
+
+class _PersistentItem(ui.DynamicItem[ui.Item[ui.View]], template=CUSTOM_ID_TEMPLATE):
+    def __init__(self, item: ui.Item[ui.View], match: Match[str], source: type[PersistentModel] | FlowStore) -> None:
+        super().__init__(item)
+        self.key: str = match['key']
+        self.index = int(match['index'])
+        self.state: str = match['state']
+        self.source = source
+
+    @classmethod
+    async def from_custom_id(cls, _: Interaction[Client], item: ui.Item[Any], match: Match[str], /) -> Self:
+        key = match['key']
+        source: type[PersistentModel] | FlowStore | None
+        if key.startswith(STORE_KEY_PREFIX):
+            if (source := get_store(key.removeprefix(STORE_KEY_PREFIX))) is None:
+                raise ValueError(f'unknown store {key!r}. store must be constructed before use.')
+        elif (source := get_model_class(key)) is None:
+            raise ValueError(f'unknown model key {key!r}. model class must be imported before use.')
+        return cls(item, match, source)
+
+    async def _load_model(self) -> ModelBase:
+        if isinstance(self.source, FlowStore):
+            if (model := await self.source.load(self.state)) is None:
+                raise RuntimeError(f'flow {self.state!r} is not found in store {self.source.name!r}.')
+            return model
+        return await maybe_coroutine(self.source.load_state, self.state)
+
+    def _controller(self, model: ModelBase) -> Controller:
+        if isinstance(self.source, FlowStore):
+            return Controller(model, self.source, flow_id=self.state)
+        return Controller(model)
+
+    async def callback(self, interaction: Interaction[Client]) -> None:
+        model = await self._load_model()
+        token = restoring_flow.set(isinstance(self.source, FlowStore))
+        try:
+            msg = await default_executor.run(model.message)
+        finally:
+            restoring_flow.reset(token)
+        if msg.items is None or not 0 <= self.index < len(msg.items):
+            raise RuntimeError(f'{model!r} does not have item at {self.index}.')
+
+        config = msg.items[self.index]
+        if isinstance(config, Link):
+            return
+        if isinstance(config, Button):
+            result = await default_executor.run(config.callback, interaction)
+        else:
+            # type-ignore: self.item is a select which has same type with config.
+            values = self.item.values  # type: ignore[reportAttributeAccessIssue, attr-defined]
+            result = await default_executor.run(config.callback, interaction, values)
+        await self._apply_result(model, msg, result, interaction)
 
-        return None if view.result is None else (*view.result, message)
+    async def _apply_result(
+        self, model: ModelBase, msg: Message, result: Result, interaction: Interaction[Client]
+    ) -> None:
+        if result._interaction is not None:
+            interaction = result._interaction
+        match result._type:
+            case _ResultTypeEnum.MESSAGE:
+                assert result._message is not None
+                await self._send_message(model, result._message, interaction)
+            case _ResultTypeEnum.MODEL:
+                assert result._model is not None
+                if msg.disable_items and interaction.message is not None:
+                    await interaction.message.edit(view=self._disabled_view(msg))
+                # type-ignore: discord.Message is _Editable
+                await self._controller(result._model).invoke(interaction, interaction.message)  # type: ignore[reportArgumentType, arg-type]
+            case _ResultTypeEnum.CONTINUE | _ResultTypeEnum.FINISH:
+                if not interaction.response.is_done():
+                    raise RuntimeError('Callback MUST consume interaction.')
+                await self._continue_or_finish(model, msg, result, interaction)
+
+    async def _continue_or_finish(
+        self, model: ModelBase, msg: Message, result: Result, interaction: Interaction[Client]
+    ) -> None:
+        if not result._is_end:
+            if isinstance(self.source, FlowStore):
+                # the callback may change the model. keep the change for the next interaction.
+                await self.source.save(self.state, model)
+            return
+        if isinstance(self.source, FlowStore):
+            await self.source.delete(self.state)
+        if msg.disable_items and interaction.message is not None:
+            await interaction.message.edit(view=self._disabled_view(msg))
+
+    async def _send_message(self, model: ModelBase, msg: Message, interaction: Interaction[Client]) -> None:
+        # type-ignore: discord.Message is _Editable
+        if msg.items is None:
+            await send_helper(interaction, msg, None, interaction.message)  # type: ignore[reportArgumentType, arg-type]
+            if isinstance(self.source, FlowStore):
+                await self.source.delete(self.state)
+            return
+        # the model is saved again. items of the message are rendered again from the saved model when clicked.
+        await self._controller(model)._send_persistent(model, msg, interaction, interaction.message)  # type: ignore[reportArgumentType, arg-type]
+
+    def _disabled_view(self, msg: Message) -> _View:
+        assert msg.items is not None
+        items: tuple[ItemType, ...] = encode_items(self.key, self.state, msg.items)
+        view = _View({}, items)
+        view.stop()
+        for child in view.children:
+            child.disabled = True  # type: ignore[reportGeneralTypeIssues, attr-defined]
+        return view
+
+
+def _retrieve_exception(task: Task[Message]) -> None:
+    # prepared messages may be discarded. retrieve exceptions of them to avoid warnings of asyncio.
+    if not task.cancelled():
+        task.exception()
+
+
+async def _cancel_all(tasks: Iterable[Task[Message]]) -> None:
+    cancelled = [task for task in tasks if task.cancel()]
+    # wait until they are cancelled, so that their side effects do not happen after this.
+    await gather(*cancelled, return_exceptions=True)
+
+
+def setup_persistent(client: Client) -> None:
+    """Register handler of PersistentModel to client. You should call this once in Client.setup_hook.
+
+    Args:
+        client (Client): client to receive interactions.
+    """
+    client.add_dynamic_items(_PersistentItem)
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import sqlite3
+from asyncio import Task, gather, get_running_loop, sleep, to_thread
+from collections import defaultdict
+from contextlib import suppress
+from datetime import UTC, datetime, timedelta
+from math import ceil
+from threading import Lock
+from time import time
+from typing import TYPE_CHECKING, NamedTuple
+
+from discord import HTTPException, Object
+from discord.utils import snowflake_time
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from os import PathLike
+
+    from discord import Client, Interaction
+
+
+__all__ = ('DeletionScheduler', 'default_scheduler')
+
+# discord rejects bulk delete of messages older than 14 days, and of more than 100 messages.
+BULK_DELETE_MAX_AGE = timedelta(days=14)
+BULK_DELETE_MAX_MESSAGES = 100
+# interaction tokens expire after this seconds.
+TOKEN_LIFETIME = 15 * 60.0
+
+
+class _Deletion(NamedTuple):
+    tick: int
+    deadline: float
+    message_id: int
+    channel_id: int | None
+    channel: object
+    interaction: Interaction[Client] | None
+    original: bool
+
+
+class DeletionScheduler:
+    """Delete messages after delay, with a timer wheel shared by all flows instead of a sleeping task per message.
+
+    Messages due in the same tick are deleted together. Messages of the same channel are bulk deleted if the channel
+    supports it. If bulk delete fails, such as without Manage Messages permission, they are deleted one by one.
+    Ephemeral messages are deleted by the interaction token, because they can not be deleted through the channel.
+
+    Args:
+        resolution (float, optional): seconds per tick. Deletions may be late by up to this. Defaults to 1.
+        slots (int, optional): number of buckets of the wheel. Defaults to 512.
+    """
+
+    def __init__(self, resolution: float = 1.0, slots: int = 512) -> None:
+        self.resolution = resolution
+        self.slots = slots
+        self.wheel: list[list[_Deletion]] = [[] for _ in range(slots)]
+        self.pending = 0
+        self.client: Client | None = None
+        self._tick = 0
+        self._origin = 0.0
+        self._task: Task[None] | None = None
+        self._deleting: set[Task[None]] = set()
+        self._connection: sqlite3.Connection | None = None
+        self._lock = Lock()
+        self._inserts: list[tuple[int, int, float]] = []
+        self._removals: list[tuple[int]] = []
+
+    def __len__(self) -> int:
+        """Number of pending deletions."""
+        return self.pending
+
+    def schedule(self, delay: float, message_id: int, channel_id: int, channel: object = None) -> None:
+        """Delete message of channel after delay. This is persisted if `persist` is called.
+
+        Args:
+            delay (float): seconds to wait before deleting.
+            message_id (int): ID of message.
+            channel_id (int): ID of channel of message.
+            channel (object, optional): channel of message, which has `get_partial_message`. If None, the channel is
+                looked up by the client passed to `persist`. Defaults to None.
+        """
+        deletion = self._add(delay, message_id, channel_id, channel, None, original=False)
+        if self._connection is not None:
+            self._inserts.append((message_id, channel_id, deletion.deadline))
+
+    def schedule_response(
+        self, delay: float, interaction: Interaction[Client], message_id: int, *, original: bool = True
+    ) -> None:
+        """Delete message sent by interaction after delay, by the interaction token. This is not persisted.
+
+        Args:
+            delay (float): seconds to wait before deleting. the token expires after 15 minutes.
+            interaction (Interaction): interaction which sent the message.
+            message_id (int): ID of message.
+            original (bool, optional): True if the message is the original response, False if followup.
+                Defaults to True.
+        """
+        self._add(delay, message_id, None, None, interaction, original=original)
+
+    def _add(  # noqa: PLR0913
+        self,
+        delay: float,
+        message_id: int,
+        channel_id: int | None,
+        channel: object,
+        interaction: Interaction[Client] | None,
+        *,
+        original: bool,
+    ) -> _Deletion:
+        loop = get_running_loop()
+        if self._task is None or self._task.done():
+            # restart the wheel from the current tick.
+            self._origin = loop.time() - self._tick * self.resolution
+            self._task = loop.create_task(self._run())
+        tick = max(self._tick + 1, ceil((loop.time() + delay - self._origin) / self.resolution))
+        deletion = _Deletion(tick, time() + delay, message_id, channel_id, channel, interaction, original)
+        self.wheel[tick % self.slots].append(deletion)
+        self.pending += 1
+        return deletion
+
+    async def _run(self) -> None:
+        loop = get_running_loop()
+        while True:
+            if not self.pending:
+                await self._flush()
+                # _add does not restart this task while flushing. deletions scheduled meanwhile are run here.
+                if not self.pending:
+                    return
+            self._tick += 1
+            await sleep(max(0.0, self._origin + self._tick * self.resolution - loop.time()))
+            bucket = self.wheel[self._tick % self.slots]
+            due = [deletion for deletion in bucket if deletion.tick <= self._tick]
+            if due:
+                bucket[:] = [deletion for deletion in bucket if deletion.tick > self._tick]
+                self.pending -= len(due)
+                # deleting does not block the wheel.
+                task = loop.create_task(self._delete(due))
+                self._deleting.add(task)
+                task.add_done_callback(self._deleting.discard)
+            await self._flush()
+
+    async def _delete(self, due: list[_Deletion]) -> None:
+        channels: defaultdict[int, list[_Deletion]] = defaultdict(list)
+        coros = []
+        for deletion in due:
+            if deletion.interaction is not None:
+                coros.append(self._delete_response(deletion))
+            elif deletion.channel_id is not None:
+                channels[deletion.channel_id].append(deletion)
+        coros.extend(self._delete_channel(channel_id, deletions) for channel_id, deletions in channels.items())
+        await gather(*coros)
+        if self._connection is not None:
+            self._removals.extend((deletion.message_id,) for deletion in due if deletion.interaction is None)
+            await self._flush()
+
+    async def _delete_response(self, deletion: _Deletion) -> None:
+        assert deletion.interaction is not None
+        with suppress(HTTPException):
+            if deletion.original:
+                await deletion.interaction.delete_original_response()
+            else:
+                await deletion.interaction.followup.delete_message(deletion.message_id)
+
+    def _resolve_channel(self, channel_id: int) -> object:
+        if self.client is None:
+            return None
+        return self.client.get_channel(channel_id) or self.client.get_partial_messageable(channel_id)
+
+    async def _delete_channel(self, channel_id: int, deletions: list[_Deletion]) -> None:
+        channel = next((d.channel for d in deletions if d.channel is not None), None)
+        if channel is None and (channel := self._resolve_channel(channel_id)) is None:
+            return
+
+        ids = [deletion.message_id for deletion in deletions]
+        remaining: list[int] = []
+        if len(ids) > 1 and (bulk_delete := getattr(channel, 'delete_messages', None)) is not None:
+            oldest = datetime.now(UTC) - BULK_DELETE_MAX_AGE
+            remaining = [i for i in ids if snowflake_time(i) <= oldest]
+            bulk = [i for i in ids if snowflake_time(i) > oldest]
+            for start in range(0, len(bulk), BULK_DELETE_MAX_MESSAGES):
+                chunk = bulk[start : start + BULK_DELETE_MAX_MESSAGES]
+                try:
+                    await bulk_delete([Object(id=i) for i in chunk])
+                except HTTPException:
+                    remaining.extend(chunk)
+        else:
+            remaining = ids
+
+        for message_id in remaining:
+            with suppress(HTTPException):
+                await channel.get_partial_message(message_id).delete()  # type: ignore[reportAttributeAccessIssue, attr-defined]
+
+    def _execute(self, sql: str, parameters: Sequence[tuple[object, ...]]) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.executemany(sql, parameters)
+
+    async def _flush(self) -> None:
+        if self._inserts:
+            inserts, self._inserts = self._inserts, []
+            await to_thread(
+                self._execute,
+                'INSERT OR REPLACE INTO deletions (message_id, channel_id, deadline) VALUES (?, ?, ?)',
+                inserts,
+            )
+        if self._removals:
+            removals, self._removals = self._removals, []
+            await to_thread(self._execute, 'DELETE FROM deletions WHERE message_id = ?', removals)
+
+    async def persist(self, client: Client, path: str | PathLike[str]) -> None:
+        """Persist pending deletions of channels into SQLite database, and schedule deletions persisted before restart.
+
+        You should call this once in Client.setup_hook. Deletions by interaction token are not persisted.
+
+        Args:
+            client (Client): client to look up channels of restored deletions.
+            path (str | PathLike[str]): path of database.
+        """
+        self.client = client
+        connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS deletions '
+            '(message_id INTEGER PRIMARY KEY, channel_id INTEGER NOT NULL, deadline REAL NOT NULL)'
+        )
+        rows: list[tuple[int, int, float]] = await to_thread(
+            lambda: connection.execute('SELECT message_id, channel_id, deadline FROM deletions').fetchall()
+        )
+        self._connection = connection
+        now = time()
+        for message_id, channel_id, deadline in rows:
+            self._add(max(0.0, deadline - now), message_id, channel_id, None, None, original=False)
+
+    def close(self) -> None:
+        """Stop the wheel and close the database. Pending deletions are kept in the database."""
+        if self._task is not None:
+            self._task.cancel()
+        inserts, self._inserts = self._inserts, []
+        self._execute('INSERT OR REPLACE INTO deletions (message_id, channel_id, deadline) VALUES (?, ?, ?)', inserts)
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+default_scheduler = DeletionScheduler()
+"""Scheduler used by send_helper for `Message.delete_after`. Call `persist` on it to keep deletions over restarts."""
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from asyncio import get_running_loop, iscoroutinefunction
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from time import time
+from typing import TYPE_CHECKING, Literal, TypeVar
+
+from discord.utils import maybe_coroutine
+
+from .metrics import Histogram
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+    from typing import Any, TypeAlias
+
+    from discord.utils import MaybeAwaitableFunc
+
+    F = TypeVar('F', bound=Callable[..., Any])
+
+T = TypeVar('T')
+
+__all__ = ('ExecutionPolicy', 'execute_in', 'FlowExecutor', 'default_executor')
+
+ExecutionPolicy: TypeAlias = Literal['loop', 'thread', 'process']
+
+
+def execute_in(policy: ExecutionPolicy) -> Callable[[F], F]:
+    """Decorator to set execution policy of synchronous callback of item, `ModelBase.message` or message builder.
+
+    - `loop`: run on the event loop. This is the default.
+    - `thread`: run in thread pool of the executor. The function must not touch the event loop.
+    - `process`: run in process pool of the executor. This is supported only for message builders of Paginator,
+        because callbacks receive interactions and `ModelBase.message` is bound to the model, which can not be
+        copied into another process. The builder, its arguments and the returned message must be picklable,
+        so the message should not have items with callbacks. This is suitable for pure functions such as rendering
+        images. Other functions with this policy raise TypeError when called.
+
+    Coroutine functions always run on the event loop.
+    """
+
+    def decorator(func: F) -> F:
+        func.__flow_execution__ = policy  # type: ignore[attr-defined]
+        return func
+
+    return decorator
+
+
+def _call(func: Callable[..., T], args: tuple[Any, ...], kwargs: Mapping[str, Any]) -> tuple[float, T]:
+    # returns start time to measure time in queue. wall clock is shared with worker processes.
+    return time(), func(*args, **kwargs)
+
+
+class _PoolStats:
+    def __init__(self) -> None:
+        self.pending = 0
+        self.max_pending = 0
+        self.completed = 0
+        self.queue_wait = Histogram()
+
+
+class FlowExecutor:
+    """Run synchronous callbacks and builders according to their execution policy. see `execute_in`.
+
+    Pools are created on first use, so attributes can be changed before that.
+
+    Args:
+        max_threads (int | None, optional): max workers of thread pool. Defaults to None (decided by Python).
+        max_processes (int | None, optional): max workers of process pool. Defaults to None (number of CPUs).
+    """
+
+    def __init__(self, max_threads: int | None = None, max_processes: int | None = None) -> None:
+        self.max_threads = max_threads
+        self.max_processes = max_processes
+        self.pools: dict[ExecutionPolicy, Executor] = {}
+        self.stats: dict[ExecutionPolicy, _PoolStats] = {'thread': _PoolStats(), 'process': _PoolStats()}
+
+    def _pool(self, policy: ExecutionPolicy) -> Executor:
+        if (pool := self.pools.get(policy)) is None:
+            pool = self.pools[policy] = (
+                ThreadPoolExecutor(self.max_threads, thread_name_prefix='discord.ext.flow')
+                if policy == 'thread'
+                else ProcessPoolExecutor(self.max_processes)
+            )
+        return pool
+
+    async def run(self, func: MaybeAwaitableFunc[..., T], /, *args: Any, **kwargs: Any) -> T:  # noqa: ANN401
+        """Call func by its execution policy, and return the result. `process` policy is rejected."""
+        if getattr(func, '__flow_execution__', 'loop') == 'process' and not iscoroutinefunction(func):
+            raise TypeError(f'{func!r} can not run in process pool. process policy is only for message builders.')
+        return await self._run(func, args, kwargs)
+
+    async def run_builder(self, func: MaybeAwaitableFunc[..., T], /, *args: Any, **kwargs: Any) -> T:  # noqa: ANN401
+        """Call message builder by its execution policy, and return the result."""
+        return await self._run(func, args, kwargs)
+
+    async def _run(self, func: MaybeAwaitableFunc[..., T], args: tuple[Any, ...], kwargs: Mapping[str, Any]) -> T:
+        policy: ExecutionPolicy = getattr(func, '__flow_execution__', 'loop')
+        if policy == 'loop' or iscoroutinefunction(func):
+            return await maybe_coroutine(func, *args, **kwargs)
+
+        stats = self.stats[policy]
+        stats.pending += 1
+        stats.max_pending = max(stats.max_pending, stats.pending)
+        submitted = time()
+        try:
+            started, result = await get_running_loop().run_in_executor(
+                self._pool(policy), partial(_call, func, args, kwargs)
+            )
+        finally:
+            stats.pending -= 1
+            stats.completed += 1
+        stats.queue_wait.observe(max(0.0, started - submitted))
+        # type-ignore: func is not a coroutine function here.
+        return result  # type: ignore[return-value]
+
+    def export(self) -> dict[str, dict[str, object]]:
+        """Export size and queue depth of pools as dict. keys are `thread` and `process`.
+
+        `pending` is the number of calls submitted and not finished, `queue_wait` is the histogram of seconds
+        between submitting and starting.
+        """
+        exported: dict[str, dict[str, object]] = {}
+        for policy, stats in self.stats.items():
+            exported[policy] = {
+                'workers': getattr(self.pools.get(policy), '_max_workers', None),
+                'pending': stats.pending,
+                'max_pending': stats.max_pending,
+                'completed': stats.completed,
+                'queue_wait': stats.queue_wait.to_dict(),
+            }
+        return exported
+
+    def shutdown(self, *, wait: bool = True) -> None:
+        """Shutdown pools. They are created again if used after this."""
+        pools, self.pools = self.pools, {}
+        for pool in pools.values():
+            pool.shutdown(wait=wait)
+
+
+default_executor = FlowExecutor()
+"""Executor used by Controller, items and Paginator. Set attributes to configure pool sizes."""
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+from asyncio import TimerHandle, get_running_loop
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Sequence
+
+    from discord import Client, Interaction
+
+    from .model import ModelBase
+
+
+__all__ = ('Histogram', 'FlowMetrics', 'AckTracker', 'default_ack_tracker')
+
+# discord fails interactions which are not responded in this seconds.
+RESPONSE_DEADLINE = 3.0
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Histogram of durations in seconds.
+
+    Args:
+        buckets (Sequence[float], optional): upper bounds of buckets in seconds. Defaults to DEFAULT_BUCKETS.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        # the last count is for values larger than all buckets.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add a duration."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Return approximated quantile. It is the upper bound of the bucket which contains the quantile.
+
+        Args:
+            q (float): quantile between 0 and 1.
+
+        Returns:
+            float: approximated quantile in seconds. 0 if no value is observed.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts, strict=False):
+            total += count
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict[str, float | int | dict[str, int]]:
+        """Export histogram as dict."""
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': {
+                **{str(bound): count for bound, count in zip(self.buckets, self.counts, strict=False)},
+                '+Inf': self.counts[-1],
+            },
+        }
+
+
+class FlowMetrics:
+    """Durations of each phase of flows, per model class.
+
+    Phases measured by this lib are `before_invoke`, `message`, `view_config`, `send_helper`, `wait`,
+    `disable_items`, `after_invoke` in Controller and `callback` in items.
+
+    Args:
+        buckets (Sequence[float], optional): upper bounds of histogram buckets in seconds.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.histograms: dict[tuple[str, str], Histogram] = {}
+
+    def observe(self, model: ModelBase | str, phase: str, seconds: float) -> None:
+        """Add a duration of phase of model."""
+        key = (model if isinstance(model, str) else type(model).__qualname__, phase)
+        if (histogram := self.histograms.get(key)) is None:
+            histogram = self.histograms[key] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    @contextmanager
+    def measure(self, model: ModelBase | str, phase: str) -> Iterator[None]:
+        """Measure duration of with block as phase of model."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(model, phase, perf_counter() - start)
+
+    def get(self, model: type[ModelBase] | str, phase: str) -> Histogram | None:
+        """Return histogram of phase of model class. None if not measured."""
+        return self.histograms.get((model if isinstance(model, str) else model.__qualname__, phase))
+
+    def export(self) -> dict[str, dict[str, dict[str, float | int | dict[str, int]]]]:
+        """Export all histograms as dict. keys are model class name and phase."""
+        exported: dict[str, dict[str, dict[str, float | int | dict[str, int]]]] = {}
+        for (model, phase), histogram in self.histograms.items():
+            exported.setdefault(model, {})[phase] = histogram.to_dict()
+        return exported
+
+    def reset(self) -> None:
+        """Remove all histograms."""
+        self.histograms.clear()
+
+
+class AckTracker:
+    """Rolling latency from creation of interactions to their first response.
+
+    Discord fails interactions which are not responded in 3 seconds, so growing latency is a sign of a saturated
+    event loop. Interactions responded by this lib are observed at the moment of response. Responses of callbacks
+    can not be timestamped, so watched interactions are observed when the callback returns or at the threshold,
+    whichever comes first. Their latency is an upper bound, and they are slow only if not responded at the threshold.
+    Latency is measured by the snowflake timestamp of interaction, so it includes gateway delay and clock skew.
+
+    Args:
+        window (int, optional): number of the latest latencies to compute quantiles. Defaults to 1024.
+        threshold (float, optional): seconds of latency to call `on_slow`. Defaults to 2.5.
+        on_slow (Callable[[Interaction, float], None] | None, optional): called with interaction and latency in
+            seconds when latency exceeds threshold. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        window: int = 1024,
+        threshold: float = 2.5,
+        on_slow: Callable[[Interaction[Client], float], None] | None = None,
+    ) -> None:
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.threshold = threshold
+        self.on_slow = on_slow
+        self.count = 0
+        self.slow = 0
+        self.missed = 0
+        self.watching: dict[int, Interaction[Client]] = {}
+        self._checks: dict[int, TimerHandle] = {}
+
+    def watch(self, interaction: Interaction[Client]) -> None:
+        """Watch interaction which may be responded by user code. It is observed by `flush` after responded."""
+        self.watching[interaction.id] = interaction
+        if interaction.id not in self._checks:
+            delay = self.threshold - _age(interaction)
+            self._checks[interaction.id] = get_running_loop().call_later(max(0.0, delay), self._check, interaction)
+
+    def _check(self, interaction: Interaction[Client]) -> None:
+        self._checks.pop(interaction.id, None)
+        if self.watching.get(interaction.id) is interaction and interaction.response.is_done():
+            # responded by user code before the threshold.
+            del self.watching[interaction.id]
+            self._add(interaction, _age(interaction), slow=False)
+
+    def flush(self) -> None:
+        """Observe watched interactions which are responded. Interactions not responded in time are dropped."""
+        for interaction in tuple(self.watching.values()):
+            if interaction.response.is_done():
+                self.observe(interaction)
+            elif _age(interaction) > RESPONSE_DEADLINE:
+                del self.watching[interaction.id]
+                self._cancel_check(interaction.id)
+                self.missed += 1
+
+    def observe(self, interaction: Interaction[Client]) -> float:
+        """Add latency of interaction, which is responded now.
+
+        Returns:
+            float: latency in seconds.
+        """
+        self.watching.pop(interaction.id, None)
+        self._cancel_check(interaction.id)
+        latency = _age(interaction)
+        self._add(interaction, latency, slow=latency >= self.threshold)
+        return latency
+
+    def _cancel_check(self, interaction_id: int) -> None:
+        if (handle := self._checks.pop(interaction_id, None)) is not None:
+            handle.cancel()
+
+    def _add(self, interaction: Interaction[Client], latency: float, *, slow: bool) -> None:
+        self.latencies.append(latency)
+        self.count += 1
+        if slow:
+            self.slow += 1
+            if self.on_slow is not None:
+                self.on_slow(interaction, latency)
+
+    def quantile(self, q: float) -> float:
+        """Return quantile of latencies in window. 0 if nothing is observed.
+
+        Args:
+            q (float): quantile between 0 and 1.
+        """
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def to_dict(self) -> dict[str, float | int]:
+        """Export counts and quantiles as dict."""
+        return {
+            'count': self.count,
+            'slow': self.slow,
+            'missed': self.missed,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+def _age(interaction: Interaction[Client]) -> float:
+    return max(0.0, (datetime.now(UTC) - interaction.created_at).total_seconds())
+
+
+default_ack_tracker = AckTracker()
+"""Tracker of all interactions responded by this lib. Set `threshold` and `on_slow` to be alerted."""
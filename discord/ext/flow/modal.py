@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-from asyncio import Future, Task, get_running_loop
+from asyncio import Future, get_running_loop
 from dataclasses import dataclass
+from functools import partial
 from typing import TYPE_CHECKING, NamedTuple, TypedDict
 
 from discord import Client, Interaction, TextStyle, ui
 
+from .metrics import default_ack_tracker
+from .observer import hooks
+
 if TYPE_CHECKING:
     from collections.abc import Sequence
 
@@ -13,7 +17,7 @@ if TYPE_CHECKING:
 __all__ = ('TextInput', 'ModalConfig', 'ModalResult', 'ModalController', 'send_modal')
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class TextInput:
     """Text input config for modal. see discord.ui.TextInput."""
 
@@ -40,7 +44,7 @@ class TextInputKWargs(TypedDict, total=False):
     row: int | None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ModalConfig:
     """Config for modal. see discord.ui.Modal."""
 
@@ -66,6 +70,8 @@ class InnerModal(ui.Modal):
     result: ModalResult
 
     def __init__(self, config: ModalConfig, text_inputs: Sequence[TextInput]) -> None:
+        # resolved on submit, cancelled on timeout.
+        self.future: Future[ModalResult] = get_running_loop().create_future()
         kwargs: ModalConfigKWargs = {'title': config.title, 'timeout': config.timeout}
         if config.custom_id is not None:
             kwargs['custom_id'] = config.custom_id
@@ -91,8 +97,18 @@ class InnerModal(ui.Modal):
             assert isinstance(child, ui.TextInput)
             results.append(child.value)
         self.result = ModalResult(tuple(results), interaction)
+        default_ack_tracker.watch(interaction)
+        for hook in hooks.interaction_received:
+            hook(None, interaction)
+        if not self.future.done():
+            self.future.set_result(self.result)
         self.stop()
 
+    async def on_timeout(self) -> None:
+        for hook in hooks.view_timed_out:
+            hook(None)
+        self.future.cancel()
+
 
 async def send_modal(
     interaction: Interaction[Client], config: ModalConfig, text_inputs: Sequence[TextInput]
@@ -109,6 +125,7 @@ async def send_modal(
     """
     inner_modal = InnerModal(config, text_inputs)
     await interaction.response.send_modal(inner_modal)
+    default_ack_tracker.observe(interaction)
     await inner_modal.wait()
     return inner_modal.result
 
@@ -122,41 +139,43 @@ class ModalController:
 
     def __init__(self) -> None:
         self.__stopped: Future[bool] = get_running_loop().create_future()
-        self.modals: list[tuple[InnerModal, Task[None]]] = []
-
-    async def _wait_modal(self, modal: InnerModal, result_future: Future[ModalResult]) -> None:
-        await modal.wait()
-
-        if self.__stopped.done():
-            result_future.cancel()
+        self.__closed = False
+        # live modals only. finished modals are removed by callback of their future.
+        self.modals: set[InnerModal] = set()
+
+    def __len__(self) -> int:
+        """Number of live modals, which are sent and waiting for submit."""
+        return len(self.modals)
+
+    def _on_modal_done(self, modal: InnerModal, future: Future[ModalResult]) -> None:
+        self.modals.discard(modal)
+        modal.stop()
+        if future.cancelled():
             return
-
-        self.__stopped.set_result(True)
-        result_future.set_result(modal.result)
-        self.__inner_cancel()
+        if not self.__stopped.done():
+            self.__stopped.set_result(True)
+        # other modals are sent before this result, so their values are outdated.
+        for other in tuple(self.modals):
+            other.future.cancel()
 
     def stop(self) -> None:
         """Stop all modals. You should call this method in Model.after_invoke method."""
-        if self.__stopped.done():
-            return
-        self.__stopped.set_result(False)
-        self.__inner_cancel()
-
-    def __inner_cancel(self) -> None:
-        for m, t in self.modals:
-            m.stop()
-            t.cancel()
+        self.__closed = True
+        if not self.__stopped.done():
+            self.__stopped.set_result(False)
+        for modal in tuple(self.modals):
+            modal.future.cancel()
 
     def is_finished(self) -> bool:
         """This modal controller is finished or not.
 
         Returns:
-            bool: True if finished.
+            bool: True if stop method is called.
         """
-        return self.__stopped.done()
+        return self.__closed
 
     async def wait(self) -> bool:
-        """Wait until all modals are finished.
+        """Wait until the first modal is submitted or stop method is called.
 
         Returns:
             bool: False if call stop method.
@@ -185,9 +204,12 @@ class ModalController:
                 raise this error. if you want catch this error and call this in flow's callback,
                 you should raise any Error. not return Result.
         """
-        result_future: Future[ModalResult] = get_running_loop().create_future()
         modal = InnerModal(config, text_inputs)
-        await interaction.response.send_modal(modal)
-        task = get_running_loop().create_task(self._wait_modal(modal, result_future))
-        self.modals.append((modal, task))
-        return await result_future
+        if self.__closed:
+            modal.future.cancel()
+        else:
+            await interaction.response.send_modal(modal)
+            default_ack_tracker.observe(interaction)
+            self.modals.add(modal)
+            modal.future.add_done_callback(partial(self._on_modal_done, modal))
+        return await modal.future
@@ -54,9 +54,21 @@ if TYPE_CHECKING:
         """Config for View.
 
         timeout: View timeout in seconds. If None, use default timeout. see discord.ui.View for more info.
+        coalesce_edits: If True, edits of the same message requested while another edit is in flight are collapsed.
+            only the latest message is sent, and the other interactions are deferred.
+        diff_edits: If True, edits send only fields which differ from the last message sent by this flow.
+            If nothing changed, the edit is skipped and the interaction is deferred.
+        reuse_items: If True, items of `Result.send_message` update existing items in place when the layout
+            (types, rows and custom_ids) is same. otherwise, all items are rebuilt.
+        prepare_next: If True, `before_invoke` and `message` of the next model are called concurrently with
+            disabling items of this message, and before `after_invoke` of this model.
         """
 
         timeout: float | None
+        coalesce_edits: bool
+        diff_edits: bool
+        reuse_items: bool
+        prepare_next: bool
 
     class MessageKwargs(TypedDict, total=False):
         content: str
@@ -137,7 +149,8 @@ class Message(NamedTuple):
         return d
 
 
-@dataclass
+# items are immutable and hashable if all fields are hashable. use dataclasses.replace to change fields.
+@dataclass(frozen=True, slots=True)
 class Button:
     """discord.ui.Button with callback for Message.items.
 
@@ -154,7 +167,7 @@ class Button:
     row: int | None = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Link:
     """discord.ui.Button for link with callback for Message.items."""
 
@@ -164,7 +177,7 @@ class Link:
     row: int | None = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Select:
     """discord.ui.Select with callback for Message.items.
 
@@ -182,7 +195,7 @@ class Select:
     options: Sequence[SelectOption] | None = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class UserSelect:
     """discord.ui.UserSelect with callback for Message.items."""
 
@@ -196,7 +209,7 @@ class UserSelect:
     default_values: Sequence[ValidDefaultValues] | None = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class RoleSelect:
     """discord.ui.RoleSelect with callback for Message.items."""
 
@@ -210,7 +223,7 @@ class RoleSelect:
     default_values: Sequence[ValidDefaultValues] | None = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MentionableSelect:
     """discord.ui.MentionableSelect with callback for Message.items."""
 
@@ -224,7 +237,7 @@ class MentionableSelect:
     default_values: Sequence[ValidDefaultValues] | None = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ChannelSelect:
     """discord.ui.ChannelSelect with callback for Message.items."""
 
@@ -261,3 +274,12 @@ class ModelBase:
     def after_invoke(self) -> MaybeAwaitable[Any]:
         """This method is called after sending message."""
         return None
+
+    def successors(self) -> MaybeAwaitable[Sequence[ModelBase]]:
+        """Models which are likely passed to `Result.next_model` by callbacks of this model.
+
+        While waiting for interactions, `before_invoke` and `message` of these models are called in advance.
+        If a callback returns one of them (the same object), the prepared message is sent without waiting.
+        Prepared messages of the other models are discarded, so these methods should not have side effects.
+        """
+        return ()
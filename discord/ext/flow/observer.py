@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from discord import Client, Interaction
+    from discord.abc import Messageable
+
+    from .controller import Controller
+    from .model import Message, ModelBase
+    from .result import Result, _ResultTypeEnum
+
+
+__all__ = ('FlowObserver', 'add_observer', 'remove_observer')
+
+
+class FlowObserver:
+    """The base class of observers of flow events. Override methods of events to observe.
+
+    Events are dispatched only to observers which override them, so events without observers cost almost nothing.
+    Methods are called synchronously in the flow, so they should return quickly. Exceptions are not caught,
+    except in `flow_finished`: all observers are called, and their exceptions are raised after that only if the flow
+    itself did not raise.
+    """
+
+    def flow_started(self, controller: Controller) -> None:
+        """Called when Controller.invoke registers the flow."""
+
+    def step_rendered(self, controller: Controller, model: ModelBase, message: Message) -> None:
+        """Called when `before_invoke` and `message` of model are done."""
+
+    def message_sent(self, messageable: Messageable | Interaction[Client], message: Message, sent: object) -> None:
+        """Called when a message is sent or edited. sent is the message object, or a handle of original response."""
+
+    def interaction_received(self, model: ModelBase | None, interaction: Interaction[Client]) -> None:
+        """Called before callback of item runs, or when modal is submitted. model is None for modals."""
+
+    def callback_finished(self, model: ModelBase | None, interaction: Interaction[Client], result: Result) -> None:
+        """Called when callback of item returns result."""
+
+    def result_applied(
+        self, model: ModelBase | None, result_type: _ResultTypeEnum, interaction: Interaction[Client]
+    ) -> None:
+        """Called when result of callback is applied to view."""
+
+    def view_timed_out(self, model: ModelBase | None) -> None:
+        """Called when view or modal times out. model is None for modals."""
+
+    def flow_finished(self, controller: Controller) -> None:
+        """Called when Controller.invoke finishes, including errors."""
+
+
+class _Hooks:
+    """Bound methods of observers per event. Each is an empty tuple if no observer overrides the event."""
+
+    flow_started: tuple[Callable[[Controller], None], ...] = ()
+    step_rendered: tuple[Callable[[Controller, ModelBase, Message], None], ...] = ()
+    message_sent: tuple[Callable[[Messageable | Interaction[Client], Message, object], None], ...] = ()
+    interaction_received: tuple[Callable[[ModelBase | None, Interaction[Client]], None], ...] = ()
+    callback_finished: tuple[Callable[[ModelBase | None, Interaction[Client], Result], None], ...] = ()
+    result_applied: tuple[Callable[[ModelBase | None, _ResultTypeEnum, Interaction[Client]], None], ...] = ()
+    view_timed_out: tuple[Callable[[ModelBase | None], None], ...] = ()
+    flow_finished: tuple[Callable[[Controller], None], ...] = ()
+
+
+_EVENTS = tuple(name for name in vars(FlowObserver) if not name.startswith('_'))
+_observers: list[FlowObserver] = []
+hooks = _Hooks()
+
+
+def _rebuild() -> None:
+    for event in _EVENTS:
+        default = getattr(FlowObserver, event)
+        bound = tuple(getattr(o, event) for o in _observers if getattr(type(o), event) is not default)
+        setattr(hooks, event, bound)
+
+
+def add_observer(observer: FlowObserver) -> None:
+    """Attach observer to all flows."""
+    _observers.append(observer)
+    _rebuild()
+
+
+def remove_observer(observer: FlowObserver) -> None:
+    """Detach observer. Do nothing if not attached."""
+    if observer in _observers:
+        _observers.remove(observer)
+        _rebuild()
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Generic, TypeVar
+from asyncio import Lock, Semaphore, Task, get_running_loop, wait
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Hashable
+from contextlib import suppress
+from dataclasses import replace
+from time import monotonic
+from typing import TYPE_CHECKING, Generic, NamedTuple, TypeVar
 
 from discord.utils import maybe_coroutine
 
+from .executor import default_executor
 from .modal import ModalConfig, ModalController, TextInput
-from .model import Button, Message
+from .model import Button, Message, ModelBase
+from .persistent import restoring_flow
 from .result import Result, _ResultTypeEnum
 
 if TYPE_CHECKING:
@@ -19,7 +27,7 @@ if TYPE_CHECKING:
 
     P = ParamSpec('P')
 
-__all__ = ('Paginator', 'paginator')
+__all__ = ('Paginator', 'paginator', 'PageCache')
 
 T = TypeVar('T')
 
@@ -29,6 +37,119 @@ NEXT_EMOJI = '\N{BLACK RIGHT-POINTING TRIANGLE}\ufe0f'
 LAST_EMOJI = '\N{BLACK RIGHT-POINTING DOUBLE TRIANGLE WITH VERTICAL BAR}\ufe0f'
 
 
+def _count_to_max_page(count: int, per_page: int) -> int:
+    div, mod = divmod(count, per_page)
+    return div + (mod != 0)
+
+
+class _PageSource(Generic[T]):
+    async def fetch(self, offset: int, limit: int) -> tuple[T, ...]:
+        raise NotImplementedError
+
+    def count(self) -> int | None:
+        return None
+
+
+class _SequenceSource(_PageSource[T]):
+    def __init__(self, values: tuple[T, ...]) -> None:
+        self.values = values
+
+    async def fetch(self, offset: int, limit: int) -> tuple[T, ...]:
+        return self.values[offset : offset + limit]
+
+    def count(self) -> int | None:
+        return len(self.values)
+
+
+class _FetchSource(_PageSource[T]):
+    def __init__(self, func: Callable[[int, int], Awaitable[Sequence[T]]]) -> None:
+        self.func = func
+
+    async def fetch(self, offset: int, limit: int) -> tuple[T, ...]:
+        return tuple(await self.func(offset, limit))
+
+
+class _IteratorSource(_PageSource[T]):
+    def __init__(self, iterator: AsyncIterator[T]) -> None:
+        self.iterator = iterator
+        self.buffer: list[T] = []
+        self.exhausted = False
+        self.lock = Lock()
+
+    async def fetch(self, offset: int, limit: int) -> tuple[T, ...]:
+        async with self.lock:
+            while not self.exhausted and len(self.buffer) < offset + limit:
+                try:
+                    self.buffer.append(await anext(self.iterator))
+                except StopAsyncIteration:
+                    self.exhausted = True
+        return tuple(self.buffer[offset : offset + limit])
+
+    def count(self) -> int | None:
+        return len(self.buffer) if self.exhausted else None
+
+
+class _RenderedPage(NamedTuple):
+    message: Message
+    has_next_page: bool
+    max_page: int | None
+
+
+class PageCache:
+    """LRU cache of messages rendered by Paginator.
+
+    One cache can be shared by many paginators. Messages which have files are not cached,
+    because files can not be sent twice.
+
+    Args:
+        maxsize (int, optional): max number of cached pages. Defaults to 32.
+        ttl (float | None, optional): seconds until cached page expires. If None, never expires. Defaults to None.
+        prefetch_concurrency (int, optional): max number of pages prefetched at the same time by paginators
+            which use this cache. Defaults to 4.
+    """
+
+    def __init__(self, maxsize: int = 32, ttl: float | None = None, prefetch_concurrency: int = 4) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.semaphore = Semaphore(prefetch_concurrency)
+        self._pages: OrderedDict[tuple[Hashable, int], tuple[float, _RenderedPage]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Number of cached pages."""
+        return len(self._pages)
+
+    def get(self, key: Hashable, page_number: int) -> _RenderedPage | None:
+        """Return cached page. return None if not cached or expired."""
+        if (entry := self._pages.get((key, page_number))) is None:
+            return None
+        expires_at, page = entry
+        if expires_at < monotonic():
+            del self._pages[key, page_number]
+            return None
+        self._pages.move_to_end((key, page_number))
+        return page
+
+    def put(self, key: Hashable, page_number: int, page: _RenderedPage) -> None:
+        """Cache page. the least recently used page is removed if cache is full."""
+        expires_at = float('inf') if self.ttl is None else monotonic() + self.ttl
+        self._pages[key, page_number] = (expires_at, page)
+        self._pages.move_to_end((key, page_number))
+        while len(self._pages) > self.maxsize:
+            self._pages.popitem(last=False)
+
+    def invalidate(self, key: Hashable, page_number: int | None = None) -> None:
+        """Remove cached page. If page_number is None, remove all pages of key."""
+        if page_number is not None:
+            self._pages.pop((key, page_number), None)
+            return
+        for k in [k for k in self._pages if k[0] == key]:
+            del self._pages[k]
+
+    def clear(self) -> None:
+        """Remove all cached pages."""
+        self._pages.clear()
+
+
 class Paginator(Generic[T]):
     """Paginator. This class is used to paginate messages.
 
@@ -42,67 +163,224 @@ class Paginator(Generic[T]):
         per_page (int, optional): items per page. Defaults to 10.
         start_page (int, optional): start page number. Defaults to 0.
         row (int, optional): row number of control buttons. Defaults to 4.
+        cache (PageCache | None, optional): cache of rendered pages. If None, pages are rendered every time.
+            Defaults to None.
+        prefetch (bool, optional): render previous and next pages in background after sending message.
+            If cache is None, a cache for this paginator is created. Prefetching is cancelled by `stop`.
+            Defaults to False.
+        cache_key (Hashable | None, optional): key of pages of this paginator in cache. Paginators with the same key
+            share rendered pages, so they must render the same pages. Call `PageCache.invalidate` with this key
+            to remove pages when values change. Defaults to None (pages are not shared).
     """
 
-    message_builder: MaybeAwaitableFunc[[tuple[T, ...], int, int], Message]
+    message_builder: MaybeAwaitableFunc[[tuple[T, ...], int, int | None], Message]
     values: tuple[T, ...]
     per_page: int
-    max_page: int
+    max_page: int | None
     current_page: int = 0
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         message_builder: MaybeAwaitableFunc[[tuple[T, ...], int, int], Message],
         values: Sequence[T],
         per_page: int = 10,
         start_page: int = 0,
         row: int = 4,
+        *,
+        cache: PageCache | None = None,
+        prefetch: bool = False,
+        cache_key: Hashable | None = None,
     ) -> None:
-        self.message_builder = message_builder
+        # type-ignore: max page number is always int if values is Sequence.
+        self.message_builder = message_builder  # type: ignore[reportAttributeAccessIssue, assignment]
         self.values = tuple(values)
         self.current_page = start_page
         self.per_page = per_page
-        div, mod = divmod(len(values), per_page)
-        self.max_page = div + (mod != 0)
+        self.max_page = _count_to_max_page(len(values), per_page)
         self.row = row
         self.modal_controller = ModalController()
+        self._source: _PageSource[T] = _SequenceSource(self.values)
+        self._count: Callable[[], Awaitable[int]] | None = None
+        self.cache = PageCache() if cache is None and prefetch else cache
+        self.cache_key: Hashable = object() if cache_key is None else cache_key
+        self.prefetch = prefetch
+        self._prefetch_tasks: dict[int, Task[None]] = {}
+        # whether the next page exists, known by rendering each page.
+        self._has_next: dict[int, bool] = {}
+        # pages of the model which renders this paginator. see `paginator`.
+        self._pages: tuple[dict[str, int], str] | None = None
+
+    @classmethod
+    def from_source(  # noqa: PLR0913
+        cls,
+        message_builder: MaybeAwaitableFunc[[tuple[T, ...], int, int | None], Message],
+        source: AsyncIterator[T] | Callable[[int, int], Awaitable[Sequence[T]]],
+        per_page: int = 10,
+        start_page: int = 0,
+        row: int = 4,
+        *,
+        count: int | Callable[[], Awaitable[int]] | None = None,
+        cache: PageCache | None = None,
+        prefetch: bool = False,
+        cache_key: Hashable | None = None,
+    ) -> Paginator[T]:
+        """Paginator which fetches only values of current page.
+
+        Args:
+            message_builder (MaybeAwaitableFunc[[tuple[T, ...], int, int | None], Message]):
+                generate message from separated values.
+                Arguments are Separated values, current page number and max page number.
+                max page number is None if number of values is unknown yet.
+            source (AsyncIterator[T] | Callable[[int, int], Awaitable[Sequence[T]]]):
+                async iterator of values, or async function which receives offset and limit and returns values.
+                values from async iterator are buffered when fetched.
+            per_page (int, optional): items per page. Defaults to 10.
+            start_page (int, optional): start page number. Defaults to 0.
+            row (int, optional): row number of control buttons. Defaults to 4.
+            count (int | Callable[[], Awaitable[int]] | None, optional):
+                number of values, or async function which returns it. called once when first message is created.
+                If None, max page number is unknown until the end of values is fetched. Defaults to None.
+            cache (PageCache | None, optional): cache of rendered pages. Defaults to None.
+            prefetch (bool, optional): render previous and next pages in background. Defaults to False.
+            cache_key (Hashable | None, optional): key of pages in cache. see Paginator. Defaults to None.
+
+        Returns:
+            Paginator[T]: paginator. `values` of this paginator is empty.
+        """
+        self = cls(message_builder, (), per_page, start_page, row, cache=cache, prefetch=prefetch, cache_key=cache_key)
+        self._source = _IteratorSource(source) if isinstance(source, AsyncIterator) else _FetchSource(source)
+        self.max_page = _count_to_max_page(count, per_page) if isinstance(count, int) else None
+        self._count = None if isinstance(count, int) else count
+        return self
+
+    async def _resolve_max_page(self) -> None:
+        if self.max_page is not None:
+            return
+        if self._count is not None:
+            self.max_page = _count_to_max_page(await self._count(), self.per_page)
+        elif (count := self._source.count()) is not None:
+            self.max_page = _count_to_max_page(count, self.per_page)
+
+    async def _page_exists(self, page_number: int) -> bool:
+        if self.max_page is not None:
+            return 0 <= page_number < self.max_page
+        if page_number < 0:
+            return False
+        if page_number <= self.current_page:
+            return True
+        # rendering the previous page fetched one more value. it is not fetched again.
+        if (task := self._prefetch_tasks.get(page_number - 1)) is not None:
+            await wait((task,))
+        if (has_next := self._has_next.get(page_number - 1)) is not None:
+            return has_next
+        if self.cache is not None and (page := self.cache.get(self.cache_key, page_number - 1)) is not None:
+            return page.has_next_page
+        return len(await self._source.fetch(self.per_page * page_number, 1)) > 0
+
+    def invalidate(self, page_number: int | None = None) -> None:
+        """Remove cached page of this paginator.
+
+        Args:
+            page_number (int | None, optional): page number to remove. If None, remove all pages. Defaults to None.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(self.cache_key, page_number)
+
+    async def _render_page(self, page_number: int) -> _RenderedPage:
+        await self._resolve_max_page()
+        if (
+            self.cache is not None
+            and (page := self.cache.get(self.cache_key, page_number)) is not None
+            and page.max_page == self.max_page
+        ):
+            self._has_next[page_number] = page.has_next_page
+            return page
+
+        # fetch one more value to know whether next page exists.
+        values = await self._source.fetch(self.per_page * page_number, self.per_page + 1)
+        await self._resolve_max_page()
+        msg = await default_executor.run_builder(
+            self.message_builder, values[: self.per_page], page_number, self.max_page
+        )
+        page = _RenderedPage(msg, len(values) > self.per_page, self.max_page)
+        self._has_next[page_number] = page.has_next_page
+        if self.cache is not None and not msg.files:
+            self.cache.put(self.cache_key, page_number, page)
+        return page
+
+    def _schedule_prefetch(self, has_next_page: bool) -> None:
+        if self.cache is None or self.modal_controller.is_finished():
+            return
+        for page_number in (self.current_page - 1, self.current_page + 1):
+            if page_number < 0 or (page_number > self.current_page and not has_next_page):
+                continue
+            if page_number in self._prefetch_tasks or self.cache.get(self.cache_key, page_number) is not None:
+                continue
+            task = get_running_loop().create_task(self._prefetch(page_number, self.cache.semaphore))
+            self._prefetch_tasks[page_number] = task
+
+    async def _prefetch(self, page_number: int, semaphore: Semaphore) -> None:
+        try:
+            # errors are raised again when the page is rendered for sending.
+            with suppress(Exception):
+                async with semaphore:
+                    await self._render_page(page_number)
+        finally:
+            self._prefetch_tasks.pop(page_number, None)
+
+    def stop(self) -> None:
+        """Stop all modals and cancel prefetching. You should call this method in Model.after_invoke method."""
+        self.modal_controller.stop()
+        for task in self._prefetch_tasks.values():
+            task.cancel()
+        self._prefetch_tasks.clear()
 
     async def _message(self, *, edit_original: bool = False) -> Message:
-        msg = await maybe_coroutine(
-            self.message_builder,
-            self.values[self.per_page * self.current_page : self.per_page * (self.current_page + 1)],
-            self.current_page,
-            self.max_page,
-        )
+        if (task := self._prefetch_tasks.get(self.current_page)) is not None:
+            await wait((task,))
+        msg, has_next_page, _ = await self._render_page(self.current_page)
+        if self.prefetch:
+            self._schedule_prefetch(has_next_page)
         items: list[ItemType] = []
         if msg.items is not None:
             for item in msg.items:
-                if hasattr(item, 'callback'):
-                    # type safe, because we are sure that item has callback attribute and this is not change type hint.
-                    item.callback = self._finalize_modal(item.callback)  # type: ignore[reportUnknownMemberType, reportArgumentType, reportAttributeAccessIssue]
-                items.append(item)
+                if not hasattr(item, 'callback'):
+                    items.append(item)
+                    continue
+                # type safe, because we are sure that item has callback attribute and this is not change type hint.
+                # item is copied, because rendered message may be cached.
+                items.append(replace(item, callback=self._finalize_modal(item.callback)))  # type: ignore[reportUnknownMemberType, reportArgumentType, reportAttributeAccessIssue, arg-type, union-attr]
         if len(items) > 20:
             raise ValueError('Message.items must be less than 20')
 
-        label = f'{self.current_page + 1}/{self.max_page}' if self.max_page > 0 else '1/1'
-
-        not_paging = self.max_page == 0
+        if self.max_page is None:
+            label = f'{self.current_page + 1}/?'
+            not_paging = self.current_page == 0 and not has_next_page
+            is_final_page = not has_next_page
+        else:
+            label = f'{self.current_page + 1}/{self.max_page}' if self.max_page > 0 else '1/1'
+            not_paging = self.max_page == 0
+            is_final_page = not_paging or self.current_page == self.max_page - 1
         is_first_page = not_paging or self.current_page == 0
-        is_final_page = not_paging or self.current_page == self.max_page - 1
 
         control_items: tuple[Button, ...] = (
             Button(emoji=FIRST_EMOJI, row=self.row, disabled=is_first_page, callback=self._go_to_first_page),
             Button(emoji=PREVIOUS_EMOJI, row=self.row, disabled=is_first_page, callback=self._go_to_previous_page),
             Button(label=label, row=self.row, disabled=not_paging, callback=self._go_to_page),
             Button(emoji=NEXT_EMOJI, row=self.row, disabled=is_final_page, callback=self._go_to_next_page),
-            Button(emoji=LAST_EMOJI, row=self.row, disabled=is_final_page, callback=self._go_to_last_page),
+            Button(
+                emoji=LAST_EMOJI,
+                row=self.row,
+                disabled=is_final_page or self.max_page is None,
+                callback=self._go_to_last_page,
+            ),
         )
 
         return msg._replace(items=tuple(items) + control_items, edit_original=edit_original or msg.edit_original)
 
     def _finalize_modal(self, callback: MaybeAwaitableFunc[P, Result]) -> Callable[P, Awaitable[Result]]:
         async def finalize(*args: P.args, **kwargs: P.kwargs) -> Result:
-            result = await maybe_coroutine(callback, *args, **kwargs)
+            result = await default_executor.run(callback, *args, **kwargs)
             if (
                 (
                     result._type in (_ResultTypeEnum.MODEL, _ResultTypeEnum.FINISH)
@@ -112,47 +390,60 @@ class Paginator(Generic[T]):
                     and (not result._message.items or result._message.disable_items)
                 )
             ):  # fmt: skip
-                # it is stop view and pagination is finished. so, we can stop all modals.
-                self.modal_controller.stop()
+                # it is stop view and pagination is finished. so, we can stop all modals and prefetching.
+                self.stop()
             return result
 
         return finalize
 
-    def _set_page_number(self, page_number: int) -> None:
-        if 0 <= page_number < self.max_page:
+    async def _set_page_number(self, page_number: int) -> None:
+        if await self._page_exists(page_number):
             self.current_page = page_number
+            if self._pages is not None:
+                pages, key = self._pages
+                pages[key] = page_number
 
     async def _go_to_first_page(self, _: Interaction[Client]) -> Result:
-        self._set_page_number(0)
+        await self._set_page_number(0)
         return Result.send_message(message=await self._message(edit_original=True))
 
     async def _go_to_previous_page(self, _: Interaction[Client]) -> Result:
-        self._set_page_number(self.current_page - 1)
+        await self._set_page_number(self.current_page - 1)
         return Result.send_message(message=await self._message(edit_original=True))
 
     async def _go_to_page(self, interaction: Interaction[Client]) -> Result:
         result = await self.modal_controller.send_modal(
             interaction,
             ModalConfig(title='Page Number'),
-            (TextInput(label='page number', placeholder=f'1 ~ {self.max_page}', required=True),),
+            (
+                TextInput(
+                    label='page number',
+                    placeholder='1 ~' if self.max_page is None else f'1 ~ {self.max_page}',
+                    required=True,
+                ),
+            ),
         )
         assert len(result.texts) >= 1
         assert result.texts[0].isdigit()
-        self._set_page_number(int(result.texts[0]) - 1)
+        await self._set_page_number(int(result.texts[0]) - 1)
         return Result.send_message(message=await self._message(edit_original=True), interaction=result.interaction)
 
     async def _go_to_next_page(self, _: Interaction[Client]) -> Result:
-        self._set_page_number(self.current_page + 1)
+        await self._set_page_number(self.current_page + 1)
         return Result.send_message(message=await self._message(edit_original=True))
 
     async def _go_to_last_page(self, _: Interaction[Client]) -> Result:
-        self._set_page_number(self.max_page - 1)
+        if self.max_page is not None:
+            await self._set_page_number(self.max_page - 1)
         return Result.send_message(message=await self._message(edit_original=True))
 
 
 def paginator(func: MaybeAwaitableFunc[P, Paginator[Any]]) -> Callable[P, Awaitable[Message]]:
     """Decorator to paginate message. This decorator wraps function in ModelBase.message.
 
+    The current page is kept on the model. When the model is loaded from FlowStore and rendered again,
+    the paginator starts from the kept page instead of `start_page`.
+
     Args:
         func (MaybeAwaitableFunc[[S], Paginator[Any]]): function to generate Paginator.
 
@@ -162,6 +453,13 @@ def paginator(func: MaybeAwaitableFunc[P, Paginator[Any]]) -> Callable[P, Awaita
     """
 
     async def wrapper(*args: P.args, **kwargs: P.kwargs) -> Message:
-        return await (await maybe_coroutine(func, *args, **kwargs))._message()
+        paginator = await maybe_coroutine(func, *args, **kwargs)
+        if args and isinstance(model := args[0], ModelBase) and hasattr(model, '__dict__'):
+            pages: dict[str, int] = model.__dict__.setdefault('_flow_pages', {})
+            key = func.__qualname__
+            if restoring_flow.get():
+                paginator.current_page = pages.get(key, paginator.current_page)
+            paginator._pages = (pages, key)
+        return await paginator._message()
 
     return wrapper
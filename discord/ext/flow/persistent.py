@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import re
+from contextvars import ContextVar
+from dataclasses import replace
+from typing import TYPE_CHECKING
+
+from .model import Button, ChannelSelect, Link, MentionableSelect, ModelBase, RoleSelect, Select, UserSelect
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Self
+
+    from discord.utils import MaybeAwaitable
+
+    from .model import ItemType
+
+
+__all__ = ('PersistentModel',)
+
+CUSTOM_ID_PREFIX = 'flow'
+STORE_KEY_PREFIX = '~'
+CUSTOM_ID_TEMPLATE = re.compile(rf'{CUSTOM_ID_PREFIX}:(?P<key>[^:]+):(?P<index>[0-9]+):(?P<state>.*)')
+MAX_CUSTOM_ID_LENGTH = 100
+
+_models: dict[str, type[PersistentModel]] = {}
+# True while a model loaded from FlowStore is rendered again to find the clicked item.
+restoring_flow: ContextVar[bool] = ContextVar('restoring_flow', default=False)
+
+
+class PersistentModel(ModelBase):
+    """The base class for models which survive bot restarts.
+
+    The model key and the state returned by `dump_state` are encoded into the custom_id of each item,
+    so the flow does not stay in memory while waiting for interactions.
+    When an item is clicked, the model is rebuilt by `load_state` and the callback of the item is called.
+    You should call `setup_persistent` once before using this model.
+
+    Note:
+        - The model key defaults to the class name, and must be unique among modules.
+            pass `key` as class argument to change it.
+        - `custom_id` of items is overwritten by this lib.
+        - `Result.send_message` edits the message with items encoded by the current state. items are rendered
+            again from `load_state` when clicked, so the message must be derived from the state.
+        - `after_invoke` is called soon after sending message.
+        - custom_id must be 100 characters or fewer. keep the state compact.
+    """
+
+    __flow_key__: str
+
+    def __init_subclass__(cls, *, key: str | None = None) -> None:
+        """Register subclass by model key."""
+        super().__init_subclass__()
+        flow_key = cls.__qualname__ if key is None else key
+        if ':' in flow_key or flow_key.startswith(STORE_KEY_PREFIX):
+            raise ValueError(f'model key must not contain ":" or start with "{STORE_KEY_PREFIX}". got {flow_key!r}')
+        registered = _models.get(flow_key)
+        # the same class is registered again when its module is reloaded.
+        if registered is not None and (registered.__module__, registered.__qualname__) != (
+            cls.__module__,
+            cls.__qualname__,
+        ):
+            raise ValueError(f'model key {flow_key!r} is already used by {registered!r}. pass another key to {cls!r}.')
+        cls.__flow_key__ = flow_key
+        _models[flow_key] = cls
+
+    def dump_state(self) -> MaybeAwaitable[str]:
+        """Dump state of this model to string. This string is encoded into custom_id."""
+        raise NotImplementedError
+
+    @classmethod
+    def load_state(cls, state: str) -> MaybeAwaitable[Self]:
+        """Rebuild model from string returned by `dump_state`."""
+        raise NotImplementedError
+
+
+def get_model_class(key: str) -> type[PersistentModel] | None:
+    """Return model class registered by key."""
+    return _models.get(key)
+
+
+def encode_custom_id(key: str, index: int, state: str) -> str:
+    """Encode model key, item index and state into custom_id."""
+    custom_id = f'{CUSTOM_ID_PREFIX}:{key}:{index}:{state}'
+    if len(custom_id) > MAX_CUSTOM_ID_LENGTH:
+        raise ValueError(f'custom_id must be {MAX_CUSTOM_ID_LENGTH} characters or fewer. got {custom_id!r}')
+    return custom_id
+
+
+def encode_items(key: str, state: str, items: Sequence[ItemType]) -> tuple[ItemType, ...]:
+    """Return items which custom_id is replaced by encoded one."""
+    encoded: list[ItemType] = []
+    for index, item in enumerate(items):
+        match item:
+            case Link(_):
+                encoded.append(item)
+            case Button(_) | Select(_) | UserSelect(_) | RoleSelect(_) | MentionableSelect(_) | ChannelSelect(_):
+                encoded.append(replace(item, custom_id=encode_custom_id(key, index, state)))
+            case _ if not hasattr(item, 'custom_id'):
+                # item which does not receive interactions.
+                encoded.append(item)
+            case _:
+                raise TypeError(f'{type(item).__qualname__} is not supported in persistent flows.')
+    return tuple(encoded)
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from asyncio import Condition, Semaphore, gather, timeout
+from collections import Counter
+from contextlib import suppress
+from itertools import count
+from typing import TYPE_CHECKING, NamedTuple
+
+from discord import HTTPException
+
+from .model import Message
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from .controller import Controller
+
+
+__all__ = ('FlowRegistry', 'default_registry')
+
+BUSY_MESSAGE = Message(content='Too many flows are running. Please try again later.', ephemeral=True)
+
+
+class _FlowEntry(NamedTuple):
+    controller: Controller
+    guild_id: int | None
+    user_id: int | None
+
+
+class FlowRegistry:
+    """Registry of live flows. Every Controller registers its flow while invoked.
+
+    If a cap is reached, new flows are rejected with `busy_message`, or wait until other flows finish if `queue`.
+    Each invocation is registered separately, so a controller invoked concurrently counts once per invocation.
+    After `shutdown`, all new flows are rejected.
+
+    Args:
+        max_flows (int | None, optional): max number of live flows. Defaults to None (unlimited).
+        max_flows_per_guild (int | None, optional): max number of live flows per guild. Defaults to None.
+        max_flows_per_user (int | None, optional): max number of live flows per user. Defaults to None.
+        queue (bool, optional): If True, wait for a free slot instead of rejecting. Defaults to False.
+        queue_timeout (float | None, optional): seconds to wait for a free slot. If timed out, the flow is rejected.
+            Defaults to None (wait forever).
+        busy_message (Message, optional): message sent instead of rejected flow. Defaults to BUSY_MESSAGE.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        max_flows: int | None = None,
+        max_flows_per_guild: int | None = None,
+        max_flows_per_user: int | None = None,
+        *,
+        queue: bool = False,
+        queue_timeout: float | None = None,
+        busy_message: Message = BUSY_MESSAGE,
+    ) -> None:
+        self.max_flows = max_flows
+        self.max_flows_per_guild = max_flows_per_guild
+        self.max_flows_per_user = max_flows_per_user
+        self.queue = queue
+        self.queue_timeout = queue_timeout
+        self.busy_message = busy_message
+        # keyed by token of each invocation, because the same controller may be invoked concurrently.
+        self.flows: dict[int, _FlowEntry] = {}
+        self._tokens = count(1)
+        self._guilds: Counter[int] = Counter()
+        self._users: Counter[int] = Counter()
+        self._released: Condition | None = None
+        self.rejected = 0
+        self.closed = False
+
+    def __len__(self) -> int:
+        """Number of live flows."""
+        return len(self.flows)
+
+    def __iter__(self) -> Iterator[Controller]:
+        """Iterate controllers of live flows. A controller invoked concurrently is yielded once."""
+        return iter(tuple(dict.fromkeys(entry.controller for entry in self.flows.values())))
+
+    def count(self, *, guild_id: int | None = None, user_id: int | None = None) -> int:
+        """Return number of live flows. If guild_id or user_id is set, count flows of it only."""
+        if guild_id is not None:
+            return self._guilds[guild_id]
+        if user_id is not None:
+            return self._users[user_id]
+        return len(self.flows)
+
+    def has_room(self, guild_id: int | None = None, user_id: int | None = None) -> bool:
+        """Return True if a new flow of guild and user does not exceed caps."""
+        if self.max_flows is not None and len(self.flows) >= self.max_flows:
+            return False
+        if (
+            self.max_flows_per_guild is not None
+            and guild_id is not None
+            and self._guilds[guild_id] >= self.max_flows_per_guild
+        ):
+            return False
+        return not (
+            self.max_flows_per_user is not None
+            and user_id is not None
+            and self._users[user_id] >= self.max_flows_per_user
+        )
+
+    def _add(self, controller: Controller, guild_id: int | None, user_id: int | None) -> int:
+        token = next(self._tokens)
+        self.flows[token] = _FlowEntry(controller, guild_id, user_id)
+        if guild_id is not None:
+            self._guilds[guild_id] += 1
+        if user_id is not None:
+            self._users[user_id] += 1
+        return token
+
+    async def acquire(
+        self, controller: Controller, guild_id: int | None = None, user_id: int | None = None
+    ) -> int | None:
+        """Register flow. If caps are reached, wait for a free slot if `queue`, otherwise return None immediately.
+
+        Returns:
+            int | None: token of this invocation, which is passed to `release`. None if rejected or closed.
+        """
+        if not self.closed and self.has_room(guild_id, user_id):
+            return self._add(controller, guild_id, user_id)
+        if self.closed or not self.queue:
+            self.rejected += 1
+            return None
+
+        if self._released is None:
+            self._released = Condition()
+        try:
+            async with timeout(self.queue_timeout), self._released:
+                await self._released.wait_for(lambda: self.closed or self.has_room(guild_id, user_id))
+                if not self.closed:
+                    return self._add(controller, guild_id, user_id)
+        except TimeoutError:
+            pass
+        self.rejected += 1
+        return None
+
+    async def release(self, token: int) -> None:
+        """Unregister flow of token returned by `acquire`. Do nothing if not registered."""
+        if (entry := self.flows.pop(token, None)) is None:
+            return
+        if entry.guild_id is not None:
+            self._guilds[entry.guild_id] -= 1
+            if self._guilds[entry.guild_id] <= 0:
+                del self._guilds[entry.guild_id]
+        if entry.user_id is not None:
+            self._users[entry.user_id] -= 1
+            if self._users[entry.user_id] <= 0:
+                del self._users[entry.user_id]
+        if self._released is not None:
+            async with self._released:
+                self._released.notify_all()
+
+    async def shutdown(self, drain_timeout: float | None = 10.0, *, concurrency: int = 10) -> None:
+        """Stop accepting new flows, wait for running callbacks, and disable items of all live flows.
+
+        Queued flows are rejected. Messages are edited by `Controller.stop`, at most `concurrency` at once so that
+        many edits do not hit the global rate limit. Failed edits are ignored.
+
+        Args:
+            drain_timeout (float | None, optional): seconds to wait for running callbacks. After this, items are
+                disabled even if callbacks are running. Defaults to 10. None waits forever.
+            concurrency (int, optional): max number of messages edited at once. Defaults to 10.
+        """
+        self.closed = True
+        if self._released is not None:
+            async with self._released:
+                self._released.notify_all()
+
+        controllers = tuple(self)
+        with suppress(TimeoutError):
+            async with timeout(drain_timeout):
+                await gather(*(controller.wait_idle() for controller in controllers))
+
+        semaphore = Semaphore(concurrency)
+
+        async def stop(controller: Controller) -> None:
+            async with semaphore:
+                with suppress(HTTPException):
+                    await controller.stop()
+
+        await gather(*(stop(controller) for controller in controllers))
+
+
+default_registry = FlowRegistry()
+"""Registry used by Controller if not specified. It has no caps by default; set attributes to configure caps."""
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import json
+from asyncio import gather, get_running_loop, sleep, wait_for
+from collections import OrderedDict
+from contextlib import suppress
+from itertools import cycle, islice
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from discord import Interaction, InteractionType
+
+from .controller import Controller
+from .metrics import Histogram
+from .observer import FlowObserver
+from .testing import FakeInteraction, FakeTransport, _wait_changed, click, submit_modal
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Sequence
+    from os import PathLike
+
+    from discord import Client, ui
+    from discord.abc import Messageable
+
+    from .model import Message, ModelBase
+    from .testing import FakeMessage
+
+
+__all__ = ('TraceEvent', 'TraceRecorder', 'load_trace', 'ReplayReport', 'replay')
+
+
+class TraceEvent(NamedTuple):
+    """Interaction of trace.
+
+    time: seconds from the first message of session.
+    kind: `component` for items, `modal` for submitting modal.
+    position: index of item among components which have custom_id. None for modals.
+    values: values of select, or texts of modal.
+    """
+
+    time: float
+    kind: str
+    position: int | None
+    values: tuple[str, ...]
+
+
+def _custom_ids(message: object) -> list[str]:
+    # custom_ids of items are random, so items are identified by position in components.
+    children = (child for row in getattr(message, 'components', ()) for child in getattr(row, 'children', (row,)))
+    return [custom_id for child in children if (custom_id := getattr(child, 'custom_id', None)) is not None]
+
+
+class _Session:
+    __slots__ = ('events', 'start')
+
+    def __init__(self) -> None:
+        self.start = perf_counter()
+        self.events: list[TraceEvent] = []
+
+
+class TraceRecorder(FlowObserver):
+    """Observer which records interactions of flows as trace for `replay`. Attach it by `add_observer`.
+
+    A session starts when a flow sends a message which is not a response to interaction of other sessions,
+    and continues by interactions of its messages.
+
+    Args:
+        max_sessions (int, optional): max number of sessions kept. The oldest session is dropped. Defaults to 10000.
+    """
+
+    def __init__(self, max_sessions: int = 10000) -> None:
+        self.max_sessions = max_sessions
+        self.sessions: OrderedDict[int, _Session] = OrderedDict()
+        self.messages: OrderedDict[int, _Session] = OrderedDict()
+
+    def message_sent(self, messageable: Messageable | Interaction[Client], message: Message, sent: object) -> None:  # noqa: ARG002
+        """Add message to the session of interaction, or start a new session."""
+        source = messageable.message if isinstance(messageable, Interaction) else None
+        if source is None or (session := self.messages.get(source.id)) is None:
+            session = _Session()
+            self.sessions[id(session)] = session
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        message_id: int = getattr(sent, 'id')  # noqa: B009
+        self.messages[message_id] = session
+        self.messages.move_to_end(message_id)
+        while len(self.messages) > self.max_sessions * 4:
+            self.messages.popitem(last=False)
+
+    def interaction_received(self, model: ModelBase | None, interaction: Interaction[Client]) -> None:  # noqa: ARG002
+        """Record interaction of items or modal."""
+        if interaction.message is None or (session := self.messages.get(interaction.message.id)) is None:
+            return
+        data: Any = interaction.data or {}
+        elapsed = round(perf_counter() - session.start, 3)
+        if interaction.type is InteractionType.modal_submit:
+            texts = tuple(
+                str(child.get('value', '')) for row in data.get('components', ()) for child in row.get('components', ())
+            )
+            session.events.append(TraceEvent(elapsed, 'modal', None, texts))
+            return
+        custom_ids = _custom_ids(interaction.message)
+        position = custom_ids.index(data['custom_id']) if data.get('custom_id') in custom_ids else None
+        if position is not None:
+            values = tuple(map(str, data.get('values', ())))
+            session.events.append(TraceEvent(elapsed, 'component', position, values))
+
+    def traces(self) -> list[list[TraceEvent]]:
+        """Return events of sessions which have interactions."""
+        return [session.events for session in self.sessions.values() if session.events]
+
+    def save(self, path: str | PathLike[str]) -> None:
+        """Write sessions to file as JSON lines. Each line is a list of events of a session."""
+        lines = (json.dumps([list(event) for event in events], separators=(',', ':')) for events in self.traces())
+        Path(path).write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+
+
+def load_trace(path: str | PathLike[str]) -> list[list[TraceEvent]]:
+    """Read trace file written by `TraceRecorder.save`."""
+    return [
+        [TraceEvent(t, kind, position, tuple(values)) for t, kind, position, values in json.loads(line)]
+        for line in Path(path).read_text(encoding='utf-8').splitlines()
+        if line.strip()
+    ]
+
+
+class ReplayReport(NamedTuple):
+    """Result of replay.
+
+    sessions: number of sessions run.
+    events: number of interactions replayed.
+    diverged: number of sessions stopped because the flow did not match the trace.
+    seconds: wall time of replay.
+    api_calls: number of calls to the in-memory Discord stand-in.
+    latency: seconds from each interaction to its response.
+    """
+
+    sessions: int
+    events: int
+    diverged: int
+    seconds: float
+    api_calls: int
+    latency: Histogram
+
+
+def _is_live(view: ui.View | None) -> bool:
+    if view is None:
+        return False
+    # routed views are finished for discord.py. their state is is_stopped.
+    return not getattr(view, 'is_stopped', view.is_finished)()
+
+
+async def _next_message(
+    interaction: FakeInteraction,
+    message: FakeMessage | None,
+    timeout: float = 5.0,  # noqa: ASYNC109
+) -> FakeMessage | None:
+    loop = get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        # the newest message which has live view.
+        candidates = [m for m in (*reversed(interaction.followup.messages), interaction.original, message) if m]
+        for candidate in candidates:
+            if _is_live(candidate.view):
+                return candidate
+        # woken up when a message is sent to the interaction or one of the candidates is edited.
+        try:
+            await _wait_changed(
+                (interaction.changes, *(m.changes for m in candidates)), max(0.0, deadline - loop.time())
+            )
+        except TimeoutError:
+            return None
+
+
+class _Replayer:
+    def __init__(self, factory: Callable[[], ModelBase | Controller], speed: float, transport: FakeTransport) -> None:
+        self.factory = factory
+        self.speed = speed
+        self.transport = transport
+        self.latency = Histogram(tuple(0.0001 * 2**i for i in range(18)))
+        self.events = 0
+        self.diverged = 0
+
+    async def run(self, events: Sequence[TraceEvent]) -> None:
+        made = self.factory()
+        controller = made if isinstance(made, Controller) else Controller(made)
+        interaction = FakeInteraction(self.transport)
+        flow = get_running_loop().create_task(controller.invoke(interaction))
+        try:
+            if not await self._drive(events, interaction):
+                self.diverged += 1
+        finally:
+            await controller.stop()
+            with suppress(TimeoutError):
+                await wait_for(flow, 5.0)
+
+    async def _drive(self, events: Sequence[TraceEvent], interaction: FakeInteraction) -> bool:
+        loop = get_running_loop()
+        start = loop.time()
+        message: FakeMessage | None = None
+        opened: FakeInteraction | None = None
+        for index, event in enumerate(events):
+            await sleep(max(0.0, start + event.time / self.speed - loop.time()))
+            if event.kind == 'modal':
+                if opened is None or opened.modal is None:
+                    return False
+                begin = perf_counter()
+                interaction = await submit_modal(opened, event.values)
+                opened = None
+            else:
+                if (message := await _next_message(interaction, message)) is None:
+                    return False
+                begin = perf_counter()
+                custom_ids = _custom_ids(message)
+                if event.position is None or event.position >= len(custom_ids):
+                    return False
+                # a click which opens modal does not finish until the modal is submitted.
+                opens_modal = index + 1 < len(events) and events[index + 1].kind == 'modal'
+                interaction = await click(
+                    message, custom_ids[event.position], values=event.values, wait=not opens_modal
+                )
+                if opens_modal:
+                    opened = interaction
+            self.latency.observe(perf_counter() - begin)
+            self.events += 1
+        return True
+
+
+async def replay(
+    traces: Iterable[Sequence[TraceEvent]],
+    factory: Callable[[], ModelBase | Controller],
+    *,
+    speed: float = 1.0,
+    sessions: int | None = None,
+    latency: float = 0.0,
+) -> ReplayReport:
+    """Replay traces against the in-memory Discord stand-in of `discord.ext.flow.testing`.
+
+    All sessions run concurrently. Each session invokes a flow created by factory, and sends the interactions of
+    a trace with the recorded timing.
+
+    Args:
+        traces (Iterable[Sequence[TraceEvent]]): traces recorded by TraceRecorder. see `load_trace`.
+        factory (Callable[[], ModelBase | Controller]): returns the initial model or controller of a session.
+        speed (float, optional): speed of replay. 2 replays twice as fast as recorded. Defaults to 1.
+        sessions (int | None, optional): number of sessions. Traces are repeated if this is larger than number of
+            traces. Defaults to None (once per trace).
+        latency (float, optional): seconds of fake API latency per call. Defaults to 0.
+
+    Returns:
+        ReplayReport: throughput and latency of replay.
+    """
+    recorded = list(traces)
+    if not recorded:
+        raise ValueError('traces are empty.')
+    selected = recorded if sessions is None else list(islice(cycle(recorded), sessions))
+    transport = FakeTransport(latency, record=False)
+    replayer = _Replayer(factory, speed, transport)
+
+    start = perf_counter()
+    await gather(*(replayer.run(events) for events in selected))
+    return ReplayReport(
+        sessions=len(selected),
+        events=replayer.events,
+        diverged=replayer.diverged,
+        seconds=perf_counter() - start,
+        api_calls=transport.call_count,
+        latency=replayer.latency,
+    )
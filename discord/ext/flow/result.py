@@ -20,7 +20,7 @@ class _ResultTypeEnum(Enum):
     FINISH = auto()
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Result:
     """You shouldn't construct this directly. use other classmethod instead."""
 
@@ -53,9 +53,14 @@ class Result:
     @classmethod
     def continue_flow(cls) -> Result:
         """Lib wait next interaction. you should consume interaction you got."""
-        return Result(_type=_ResultTypeEnum.CONTINUE)
+        return _CONTINUE_FLOW
 
     @classmethod
     def finish_flow(cls) -> Result:
         """Stop flow. you should consume interaction you got."""
-        return Result(_type=_ResultTypeEnum.FINISH, _is_end=True)
+        return _FINISH_FLOW
+
+
+# these results have no state, so they are shared.
+_CONTINUE_FLOW = Result(_type=_ResultTypeEnum.CONTINUE)
+_FINISH_FLOW = Result(_type=_ResultTypeEnum.FINISH, _is_end=True)
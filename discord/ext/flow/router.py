@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from discord import InteractionType
+
+if TYPE_CHECKING:
+    from discord import Client, Interaction, ui
+
+    from .view import _RoutedView
+
+
+__all__ = ('InteractionRouter',)
+
+
+class InteractionRouter:
+    """Dispatch component interactions of flows by message ID and custom_id.
+
+    Views of Controller with router are not stored in discord.py ViewStore and have no timeout task.
+    Instead, the router finds the waiting item of an interaction in a dict, and timeouts are scheduled on the loop.
+    The router must receive interactions by `setup` or by calling `dispatch` in `on_interaction` event.
+
+    Like discord.py ViewStore, items are routed by custom_id until their message is sent, and by the pair of
+    message ID and custom_id after that. So flows can use the same static custom_id on different messages.
+    """
+
+    def __init__(self) -> None:
+        self.routes: dict[tuple[int | None, str], tuple[_RoutedView, ui.Item[_RoutedView]]] = {}
+
+    def __len__(self) -> int:
+        """Number of routed items."""
+        return len(self.routes)
+
+    def add(self, view: _RoutedView) -> None:
+        """Route interactions of children of view."""
+        for child in view.children:
+            if (custom_id := getattr(child, 'custom_id', None)) is not None:
+                self.routes[view.message_id, custom_id] = (view, child)
+
+    def remove(self, view: _RoutedView) -> None:
+        """Stop routing interactions of children of view."""
+        for child in view.children:
+            if (custom_id := getattr(child, 'custom_id', None)) is None:
+                continue
+            key = (view.message_id, custom_id)
+            if (route := self.routes.get(key)) is not None and route[0] is view:
+                del self.routes[key]
+
+    def bind(self, view: _RoutedView, message_id: int) -> None:
+        """Route interactions of children of view only from the message of message_id."""
+        self.remove(view)
+        view.message_id = message_id
+        if not view.is_stopped():
+            self.add(view)
+
+    async def dispatch(self, interaction: Interaction[Client]) -> bool:
+        """Dispatch interaction to the waiting item.
+
+        Returns:
+            bool: True if the interaction is routed to an item of flows.
+        """
+        if interaction.type is not InteractionType.component or interaction.data is None:
+            return False
+        custom_id = interaction.data.get('custom_id')
+        if not isinstance(custom_id, str):
+            return False
+        message_id = None if interaction.message is None else interaction.message.id
+        # the message may be clicked before the router knows its ID.
+        if (route := self.routes.get((message_id, custom_id)) or self.routes.get((None, custom_id))) is None:
+            return False
+
+        view, item = route
+        view.refresh_timeout()
+        # type-ignore: data of component interaction.
+        item._refresh_state(interaction, interaction.data)  # type: ignore[reportArgumentType, arg-type]
+        with view.dispatching():
+            try:
+                if await view.interaction_check(interaction):
+                    await item.callback(interaction)
+            except Exception as e:  # noqa: BLE001
+                await view.on_error(interaction, e, item)
+        return True
+
+    def setup(self, client: Client) -> None:
+        """Register `dispatch` as `on_interaction` listener of client. You should call this once in setup_hook.
+
+        Args:
+            client (Client): client which has `add_listener`, such as commands.Bot.
+                For discord.Client, call `dispatch` in your `on_interaction` event instead.
+        """
+        if (add_listener := getattr(client, 'add_listener', None)) is None:
+            raise TypeError('client does not have add_listener. call InteractionRouter.dispatch in on_interaction.')
+        add_listener(self.dispatch, 'on_interaction')
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import pickle
+import re
+import sqlite3
+from asyncio import to_thread
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from os import PathLike
+
+    from .model import ModelBase
+
+
+__all__ = ('FlowStore', 'MemoryFlowStore', 'SQLiteFlowStore', 'SnapshotFlowStore')
+
+_stores: dict[str, FlowStore] = {}
+# flow_id is decoded from custom_id. IDs made by Controller are in the alphabet of secrets.token_urlsafe.
+_FLOW_ID = re.compile(r'[A-Za-z0-9_-]+')
+
+
+def get_store(name: str) -> FlowStore | None:
+    """Return flow store registered by name."""
+    return _stores.get(name)
+
+
+class FlowStore:
+    """The base class of flow state store.
+
+    Controller saves current model to the store after sending each message, and does not keep the flow in memory.
+    When an item is clicked, the model is loaded from the store.
+    A store is registered by name when constructed, and the name is encoded into custom_id of items.
+    Names must be unique. call `unregister` to replace a store by another store of the same name.
+
+    Args:
+        name (str, optional): name of this store. Defaults to 'default'.
+    """
+
+    name: str
+
+    def __init__(self, name: str = 'default') -> None:
+        if ':' in name:
+            raise ValueError(f'store name must not contain ":". got {name!r}')
+        if (registered := _stores.get(name)) is not None:
+            raise ValueError(f'store name {name!r} is already used by {registered!r}. pass another name.')
+        self.name = name
+        _stores[name] = self
+
+    def unregister(self) -> None:
+        """Unregister this store. Items of flows saved in this store are not dispatched after this."""
+        if _stores.get(self.name) is self:
+            del _stores[self.name]
+
+    async def save(self, flow_id: str, model: ModelBase) -> None:
+        """Save model of flow."""
+        raise NotImplementedError
+
+    async def load(self, flow_id: str) -> ModelBase | None:
+        """Load model of flow. return None if not found."""
+        raise NotImplementedError
+
+    async def delete(self, flow_id: str) -> None:
+        """Delete model of flow. do nothing if not found."""
+        raise NotImplementedError
+
+
+class MemoryFlowStore(FlowStore):
+    """In-memory flow store. The least recently used flow is evicted if the store is full.
+
+    Args:
+        maxsize (int, optional): max number of flows. Defaults to 10000.
+        name (str, optional): name of this store. Defaults to 'default'.
+    """
+
+    def __init__(self, maxsize: int = 10000, name: str = 'default') -> None:
+        super().__init__(name)
+        self.maxsize = maxsize
+        self.models: OrderedDict[str, ModelBase] = OrderedDict()
+
+    async def save(self, flow_id: str, model: ModelBase) -> None:
+        """Save model of flow."""
+        self.models[flow_id] = model
+        self.models.move_to_end(flow_id)
+        while len(self.models) > self.maxsize:
+            self.models.popitem(last=False)
+
+    async def load(self, flow_id: str) -> ModelBase | None:
+        """Load model of flow. return None if not found or evicted."""
+        if (model := self.models.get(flow_id)) is not None:
+            self.models.move_to_end(flow_id)
+        return model
+
+    async def delete(self, flow_id: str) -> None:
+        """Delete model of flow."""
+        self.models.pop(flow_id, None)
+
+
+class SQLiteFlowStore(FlowStore):
+    """Flow store backed by a local SQLite file. Models are pickled, so they must be picklable.
+
+    Args:
+        path (str | PathLike[str]): path of the database file.
+        name (str, optional): name of this store. Defaults to 'default'.
+    """
+
+    def __init__(self, path: str | PathLike[str], name: str = 'default') -> None:
+        super().__init__(name)
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS flows (id TEXT PRIMARY KEY, model BLOB NOT NULL)')
+
+    def _execute(self, sql: str, parameters: tuple[object, ...]) -> list[tuple[bytes]]:
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    async def save(self, flow_id: str, model: ModelBase) -> None:
+        """Save model of flow."""
+        data = pickle.dumps(model)
+        await to_thread(self._execute, 'INSERT OR REPLACE INTO flows (id, model) VALUES (?, ?)', (flow_id, data))
+
+    async def load(self, flow_id: str) -> ModelBase | None:
+        """Load model of flow. return None if not found."""
+        rows = await to_thread(self._execute, 'SELECT model FROM flows WHERE id = ?', (flow_id,))
+        if not rows:
+            return None
+        # data is written by this store only.
+        model: ModelBase = pickle.loads(rows[0][0])  # noqa: S301
+        return model
+
+    async def delete(self, flow_id: str) -> None:
+        """Delete model of flow."""
+        await to_thread(self._execute, 'DELETE FROM flows WHERE id = ?', (flow_id,))
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+
+class SnapshotFlowStore(FlowStore):
+    """Flow store which writes a pickled snapshot file per flow into a directory.
+
+    Args:
+        directory (str | PathLike[str]): directory to write snapshots. created if not exists.
+        name (str, optional): name of this store. Defaults to 'default'.
+    """
+
+    def __init__(self, directory: str | PathLike[str], name: str = 'default') -> None:
+        super().__init__(name)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, flow_id: str) -> Path:
+        # flow_id comes from custom_id of interactions. reject anything which can escape the directory.
+        if _FLOW_ID.fullmatch(flow_id) is None:
+            raise ValueError(f'invalid flow_id {flow_id!r}. flow_id must consist of A-Z, a-z, 0-9, "_" and "-".')
+        return self.directory / f'{flow_id}.pickle'
+
+    def _write(self, flow_id: str, data: bytes) -> None:
+        tmp = self._path(flow_id).with_suffix('.tmp')
+        tmp.write_bytes(data)
+        tmp.replace(self._path(flow_id))
+
+    def _read(self, flow_id: str) -> bytes | None:
+        try:
+            return self._path(flow_id).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    async def save(self, flow_id: str, model: ModelBase) -> None:
+        """Save model of flow."""
+        await to_thread(self._write, flow_id, pickle.dumps(model))
+
+    async def load(self, flow_id: str) -> ModelBase | None:
+        """Load model of flow. return None if not found or flow_id is invalid."""
+        if _FLOW_ID.fullmatch(flow_id) is None or (data := await to_thread(self._read, flow_id)) is None:
+            return None
+        # data is written by this store only.
+        model: ModelBase = pickle.loads(data)  # noqa: S301
+        return model
+
+    async def delete(self, flow_id: str) -> None:
+        """Delete model of flow."""
+        await to_thread(self._path(flow_id).unlink, missing_ok=True)
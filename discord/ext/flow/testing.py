@@ -0,0 +1,496 @@
+from __future__ import annotations
+
+from asyncio import Future, Task, get_running_loop, sleep, wait_for
+from contextlib import suppress
+from datetime import UTC, datetime
+from itertools import count
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from discord import (
+    ActionRow,
+    Client,
+    Interaction,
+    InteractionResponse,
+    InteractionResponseType,
+    InteractionType,
+    Object,
+    Permissions,
+    ui,
+)
+from discord.errors import InteractionResponded
+from discord.ui.select import BaseSelect
+from discord.utils import MISSING, time_snowflake
+
+from .controller import _PersistentItem
+from .persistent import CUSTOM_ID_TEMPLATE
+from .view import _RoutedView, _View
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Self
+
+
+__all__ = (
+    'FakeTransport',
+    'FakeMessage',
+    'FakeMessageable',
+    'FakeInteractionResponse',
+    'FakeCallbackResponse',
+    'FakeFollowup',
+    'FakeInteraction',
+    'click',
+    'submit_modal',
+    'wait_for_view',
+)
+
+
+class _Changes:
+    """Waiters which are woken up when the owner changes, instead of polling it."""
+
+    __slots__ = ('waiters',)
+
+    def __init__(self) -> None:
+        self.waiters: list[Future[None]] = []
+
+    def notify(self) -> None:
+        waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+async def _wait_changed(sources: Sequence[_Changes], timeout: float | None) -> None:  # noqa: ASYNC109
+    waiter: Future[None] = get_running_loop().create_future()
+    for source in sources:
+        source.waiters.append(waiter)
+    try:
+        await wait_for(waiter, timeout)
+    finally:
+        for source in sources:
+            with suppress(ValueError):
+                source.waiters.remove(waiter)
+
+
+class FakeTransport:
+    """In-memory stand-in of Discord API. All fake objects which share a transport record calls into it.
+
+    Args:
+        latency (float, optional): seconds to sleep per API call. Defaults to 0.
+        record (bool, optional): If True, keep all calls in `calls`. Defaults to True.
+    """
+
+    def __init__(self, latency: float = 0.0, record: bool = True) -> None:
+        self.latency = latency
+        self.record = record
+        self.calls: list[tuple[str, dict[str, Any]]] = []
+        self.call_count = 0
+        self._counter = count()
+
+    def next_id(self) -> int:
+        """Return new snowflake of current time."""
+        return time_snowflake(datetime.now(UTC)) + (next(self._counter) & 0x3FFFFF)
+
+    async def request(self, name: str, kwargs: dict[str, Any]) -> None:
+        """Record API call."""
+        self.call_count += 1
+        if self.record:
+            self.calls.append((name, kwargs))
+        if self.latency > 0:
+            await sleep(self.latency)
+
+
+class FakeMessage:
+    """Stand-in of discord.Message, InteractionMessage and WebhookMessage."""
+
+    def __init__(self, transport: FakeTransport, channel: FakeMessageable | None, **kwargs: Any) -> None:  # noqa: ANN401
+        self.transport = transport
+        self.channel = channel
+        self.id = transport.next_id()
+        self.content: str | None = None
+        self.embeds: list[Any] = []
+        self.attachments: list[Any] = []
+        self.view: ui.View | None = None
+        self.ephemeral: bool = kwargs.get('ephemeral', False)
+        self.deleted = False
+        self.changes = _Changes()
+        self._apply(kwargs)
+
+    def _apply(self, kwargs: dict[str, Any]) -> None:
+        self.changes.notify()
+        if 'content' in kwargs:
+            self.content = kwargs['content']
+        if 'embeds' in kwargs:
+            self.embeds = list(kwargs['embeds'] or ())
+        if 'files' in kwargs:
+            self.attachments = list(kwargs['files'] or ())
+        if 'attachments' in kwargs:
+            self.attachments = list(kwargs['attachments'] or ())
+        if 'view' in kwargs:
+            self.view = kwargs['view']
+
+    @property
+    def components(self) -> list[ActionRow]:
+        """Components of view, in the same order as discord.Message.components."""
+        if self.view is None:
+            return []
+        # type-ignore: payload of view is action rows.
+        return [ActionRow(row) for row in self.view.to_components()]  # type: ignore[arg-type]
+
+    async def edit(self, **kwargs: Any) -> Self:  # noqa: ANN401
+        """Edit message."""
+        await self.transport.request('message.edit', kwargs)
+        self._apply(kwargs)
+        return self
+
+    async def delete(self, *, delay: float | None = None) -> None:
+        """Delete message."""
+        if delay is not None:
+            await sleep(delay)
+        await self.transport.request('message.delete', {'id': self.id})
+        self.deleted = True
+
+
+class FakeMessageable:
+    """Stand-in of discord.abc.Messageable, such as a text channel.
+
+    Args:
+        transport (FakeTransport | None, optional): transport to record calls. Defaults to new transport.
+        guild_id (int | None, optional): guild ID of this channel. Defaults to None.
+    """
+
+    def __init__(self, transport: FakeTransport | None = None, guild_id: int | None = None) -> None:
+        self.transport = FakeTransport() if transport is None else transport
+        self.id = self.transport.next_id()
+        self.guild_id = guild_id
+        self.messages: list[FakeMessage] = []
+
+    async def send(
+        self,
+        content: str | None = None,
+        *,
+        delete_after: float | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> FakeMessage:
+        """Send message."""
+        kwargs['content'] = content
+        await self.transport.request('channel.send', kwargs)
+        message = FakeMessage(self.transport, self, **kwargs)
+        self.messages.append(message)
+        if delete_after is not None:
+            await message.delete(delay=delete_after)
+        return message
+
+    def get_partial_message(self, message_id: int, /) -> FakeMessage:
+        """Return message sent to this channel, or a placeholder of message which has the ID."""
+        for message in self.messages:
+            if message.id == message_id:
+                return message
+        message = FakeMessage(self.transport, self)
+        message.id = message_id
+        return message
+
+    async def delete_messages(self, messages: Sequence[Object]) -> None:
+        """Bulk delete messages."""
+        await self.transport.request('channel.delete_messages', {'ids': [m.id for m in messages]})
+        ids = {m.id for m in messages}
+        for message in self.messages:
+            if message.id in ids:
+                message.deleted = True
+
+
+class FakeCallbackResponse(NamedTuple):
+    """Stand-in of discord.InteractionCallbackResponse."""
+
+    id: int
+    type: InteractionResponseType
+    message_id: int | None
+
+
+class FakeInteractionResponse(InteractionResponse[Client]):
+    """Stand-in of discord.InteractionResponse."""
+
+    _parent: FakeInteraction
+
+    async def _respond(self, name: str, kwargs: dict[str, Any], response_type: InteractionResponseType) -> None:
+        if self._response_type:
+            raise InteractionResponded(self._parent)
+        await self._parent.transport.request(name, kwargs)
+        self._response_type = response_type
+
+    async def send_message(self, content: str | None = None, **kwargs: Any) -> FakeCallbackResponse:  # type: ignore[override]  # noqa: ANN401
+        """Send message as response."""
+        kwargs['content'] = content
+        delete_after = kwargs.pop('delete_after', None)
+        await self._respond('response.send_message', kwargs, InteractionResponseType.channel_message)
+        message = self._parent.original = FakeMessage(self._parent.transport, self._parent.fake_channel, **kwargs)
+        self._parent.changes.notify()
+        if delete_after is not None:
+            task = get_running_loop().create_task(message.delete(delay=delete_after))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        return FakeCallbackResponse(self._parent.id, InteractionResponseType.channel_message, message.id)
+
+    async def edit_message(self, **kwargs: Any) -> None:  # type: ignore[override]  # noqa: ANN401
+        """Edit message of component as response."""
+        if (message := self._parent.fake_message) is None:
+            raise TypeError('This interaction does not have message.')
+        await self._respond('response.edit_message', kwargs, InteractionResponseType.message_update)
+        message._apply(kwargs)
+        self._parent.original = message
+        self._parent.changes.notify()
+
+    async def defer(self, *, ephemeral: bool = False, thinking: bool = False) -> None:  # type: ignore[override]
+        """Defer response."""
+        kwargs: dict[str, Any] = {'ephemeral': ephemeral, 'thinking': thinking}
+        if self._parent.type is InteractionType.component and not thinking:
+            await self._respond('response.defer', kwargs, InteractionResponseType.deferred_message_update)
+            self._parent.original = self._parent.fake_message
+        else:
+            await self._respond('response.defer', kwargs, InteractionResponseType.deferred_channel_message)
+        self._parent.changes.notify()
+
+    async def send_modal(self, modal: ui.Modal, /) -> None:  # type: ignore[override]
+        """Send modal as response."""
+        await self._respond('response.send_modal', {'modal': modal}, InteractionResponseType.modal)
+        self._parent.modal = modal
+        self._parent.changes.notify()
+
+
+class FakeFollowup:
+    """Stand-in of Interaction.followup webhook."""
+
+    def __init__(self, interaction: FakeInteraction) -> None:
+        self.interaction = interaction
+        self.messages: list[FakeMessage] = []
+
+    async def send(self, content: str | None = None, **kwargs: Any) -> FakeMessage:  # noqa: ANN401
+        """Send followup message."""
+        kwargs['content'] = content
+        kwargs.pop('wait', None)
+        await self.interaction.transport.request('followup.send', kwargs)
+        message = FakeMessage(self.interaction.transport, self.interaction.fake_channel, **kwargs)
+        self.messages.append(message)
+        self.interaction.changes.notify()
+        return message
+
+    async def delete_message(self, message_id: int, /) -> None:
+        """Delete followup message."""
+        await self.interaction.transport.request('followup.delete_message', {'id': message_id})
+        for message in self.messages:
+            if message.id == message_id:
+                message.deleted = True
+
+
+class FakeInteraction(Interaction[Client]):
+    """Stand-in of discord.Interaction. This can be passed to Controller.invoke.
+
+    Args:
+        transport (FakeTransport | None, optional): transport to record calls. Defaults to new transport.
+        message (FakeMessage | None, optional): message of component. Defaults to None.
+        custom_id (str | None, optional): custom_id of component. Defaults to None.
+        user_id (int, optional): ID of user. Defaults to 0.
+        guild_id (int | None, optional): ID of guild. Defaults to None.
+        type (InteractionType, optional): type of interaction. Defaults to application_command if message is None,
+            otherwise component.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        transport: FakeTransport | None = None,
+        *,
+        message: FakeMessage | None = None,
+        custom_id: str | None = None,
+        user_id: int = 0,
+        guild_id: int | None = None,
+        type: InteractionType | None = None,  # noqa: A002
+    ) -> None:
+        # Interaction.__init__ requires gateway state. set only attributes used by this lib.
+        self.transport = FakeTransport() if transport is None else transport
+        self.id = self.transport.next_id()
+        if type is None:
+            type = InteractionType.application_command if message is None else InteractionType.component  # noqa: A001
+        self.type = type
+        self.guild_id = guild_id
+        # the bot is installed in the guild with all permissions, or installed by the user outside guilds.
+        self._integration_owners = {1: user_id} if guild_id is None else {0: guild_id}
+        self._app_permissions = Permissions.all().value if guild_id is not None else 0
+        self.fake_message = message
+        # type-ignore: FakeMessage is a stand-in of Message.
+        self.message = message  # type: ignore[assignment]
+        self.fake_channel = None if message is None else message.channel
+        self.user = Object(id=user_id)  # type: ignore[assignment]
+        self.data = {'custom_id': custom_id} if custom_id is not None else {}  # type: ignore[assignment, typeddict-item]
+        self.token = ''
+        self.extras = {}
+        self.command_failed = False
+        self.original: FakeMessage | None = None
+        self.modal: ui.Modal | None = None
+        self.changes = _Changes()
+        self._fake_response = FakeInteractionResponse(self)
+        self._fake_followup = FakeFollowup(self)
+
+    @property
+    def response(self) -> FakeInteractionResponse:  # type: ignore[override]
+        """Fake interaction response."""
+        return self._fake_response
+
+    @property
+    def channel(self) -> FakeMessageable | None:  # type: ignore[override]
+        """Fake channel of message."""
+        return self.fake_channel
+
+    @property
+    def followup(self) -> FakeFollowup:  # type: ignore[override]
+        """Fake followup webhook."""
+        return self._fake_followup
+
+    async def original_response(self) -> FakeMessage:  # type: ignore[override]
+        """Return message sent by response."""
+        if self.original is None:
+            raise RuntimeError('This interaction does not have original response.')
+        await self.transport.request('original_response', {})
+        return self.original
+
+    async def edit_original_response(self, **kwargs: Any) -> FakeMessage:  # type: ignore[override]  # noqa: ANN401
+        """Edit message sent by response."""
+        if self.original is None:
+            raise RuntimeError('This interaction does not have original response.')
+        return await self.original.edit(**{name: value for name, value in kwargs.items() if value is not MISSING})
+
+    async def delete_original_response(self) -> None:
+        """Delete message sent by response."""
+        if self.original is not None:
+            await self.original.delete()
+
+
+async def wait_for_view(
+    target: FakeInteraction | FakeMessage,
+    previous: ui.View | None = None,
+    *,
+    timeout: float = 5.0,  # noqa: ASYNC109
+) -> FakeMessage:
+    """Wait until message has a view other than previous.
+
+    Args:
+        target (FakeInteraction | FakeMessage): message, or interaction whose original response is waited.
+        previous (ui.View | None, optional): view which is already seen. Defaults to None.
+        timeout (float, optional): seconds to wait. Defaults to 5.
+
+    Returns:
+        FakeMessage: message which has the view.
+    """
+    loop = get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        message = target.original if isinstance(target, FakeInteraction) else target
+        if message is not None and message.view is not None and message.view is not previous:
+            return message
+        # woken up when the original response is sent or the message is edited.
+        sources = [target.changes] if message is None or message is target else [target.changes, message.changes]
+        try:
+            await _wait_changed(sources, max(0.0, deadline - loop.time()))
+        except TimeoutError:
+            raise TimeoutError('view is not sent.') from None
+
+
+_background_tasks: set[Task[Any]] = set()
+
+
+def _find_item(view: ui.View, item: int | str) -> ui.Item[Any]:
+    children = [child for child in view.children if getattr(child, 'custom_id', None) is not None]
+    if isinstance(item, int):
+        return children[item]
+    for child in children:
+        if getattr(child, 'custom_id', None) == item:
+            return child
+    raise LookupError(f'item {item!r} is not found.')
+
+
+async def _dispatch(view: ui.View, item: ui.Item[Any], interaction: FakeInteraction) -> None:
+    # same as discord.py View dispatching, except that errors are raised.
+    if isinstance(view, _View):
+        with view.dispatching():
+            await item.callback(interaction)
+    else:
+        await item.callback(interaction)
+
+
+async def click(
+    message: FakeMessage,
+    item: int | str = 0,
+    *,
+    values: Sequence[Any] = (),
+    user_id: int = 0,
+    wait: bool = True,
+) -> FakeInteraction:
+    """Click button or choose values of select in message, and wait until the callback finishes.
+
+    Args:
+        message (FakeMessage): message which has view.
+        item (int | str, optional): index of dispatchable items (Link is skipped) or custom_id. Defaults to 0.
+        values (Sequence[Any], optional): values of select. Defaults to ().
+        user_id (int, optional): ID of user. Defaults to 0.
+        wait (bool, optional): If False, return as soon as the interaction is responded, such as sending modal.
+            The callback keeps running in background. Defaults to True.
+
+    Returns:
+        FakeInteraction: interaction passed to callback.
+    """
+    if message.view is None:
+        raise ValueError('message does not have view.')
+    target = _find_item(message.view, item)
+    custom_id: str = getattr(target, 'custom_id')  # noqa: B009
+    interaction = FakeInteraction(message.transport, message=message, custom_id=custom_id, user_id=user_id)
+    if isinstance(target, BaseSelect):
+        interaction.data['values'] = list(values)  # type: ignore[index, typeddict-unknown-key]
+        target._refresh_state(interaction, interaction.data)  # type: ignore[arg-type]
+    if (match := CUSTOM_ID_TEMPLATE.fullmatch(custom_id)) is not None:
+        # persistent item is dispatched by DynamicItem.
+        target = await _PersistentItem.from_custom_id(interaction, target, match)
+    # routed view is dispatched by its router.
+    coro = (
+        message.view.router.dispatch(interaction)
+        if isinstance(message.view, _RoutedView)
+        else _dispatch(message.view, target, interaction)
+    )
+    if wait:
+        await coro
+        return interaction
+
+    task = get_running_loop().create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(lambda _: interaction.changes.notify())
+    while not interaction.response.is_done():
+        if task.done():
+            # raise error of callback if any.
+            task.result()
+            break
+        await _wait_changed((interaction.changes,), None)
+    return interaction
+
+
+async def submit_modal(interaction: FakeInteraction, texts: Sequence[str], *, user_id: int = 0) -> FakeInteraction:
+    """Submit modal sent by interaction, and wait until on_submit finishes.
+
+    Args:
+        interaction (FakeInteraction): interaction which sent modal.
+        texts (Sequence[str]): values of text inputs.
+        user_id (int, optional): ID of user. Defaults to 0.
+
+    Returns:
+        FakeInteraction: interaction passed to on_submit.
+    """
+    if interaction.modal is None:
+        raise ValueError('interaction does not send modal.')
+    submit = FakeInteraction(
+        interaction.transport, message=interaction.fake_message, user_id=user_id, type=InteractionType.modal_submit
+    )
+    components: list[dict[str, Any]] = []
+    for child, text in zip(interaction.modal.children, texts, strict=False):
+        if isinstance(child, ui.TextInput):
+            child._refresh_state(submit, {'value': text})  # type: ignore[typeddict-item]
+            components.append({'type': 1, 'components': [{'type': 4, 'custom_id': child.custom_id, 'value': text}]})
+    submit.data = {'custom_id': interaction.modal.custom_id, 'components': components}  # type: ignore[assignment]
+    await interaction.modal.on_submit(submit)
+    return submit
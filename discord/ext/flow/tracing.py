@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Protocol
+
+try:
+    from opentelemetry import trace as otel_trace  # type: ignore[reportMissingImports, import-not-found, unused-ignore]
+except ImportError:
+    otel_trace = None
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from contextlib import AbstractContextManager
+    from typing import TypeAlias
+
+    AttributeValue: TypeAlias = str | bool | int | float
+
+
+__all__ = ('Tracer', 'OpenTelemetryTracer')
+
+
+class Tracer(Protocol):
+    """Minimal tracing interface. Implement `start_span` to record spans.
+
+    Spans opened by this lib are
+    - `flow` per Controller.invoke,
+    - `flow.step` per message of flow,
+    - `flow.callback` per callback of items. parent is the step which sent the items,
+    - `flow.send` per sending or editing message.
+    """
+
+    def start_span(
+        self, name: str, attributes: Mapping[str, AttributeValue] | None = None, parent: object = None
+    ) -> AbstractContextManager[object]:
+        """Start span. The returned context manager ends span on exit, and its value can be passed as parent.
+
+        Args:
+            name (str): name of span.
+            attributes (Mapping[str, str | bool | int | float] | None, optional): attributes of span.
+                Defaults to None.
+            parent (object, optional): span returned by this method. If None, use current span. Defaults to None.
+        """
+        ...
+
+
+class OpenTelemetryTracer:
+    """Tracer which records spans with OpenTelemetry. This does nothing if opentelemetry-api is not installed.
+
+    Args:
+        name (str, optional): name of tracer. Defaults to 'discord.ext.flow'.
+    """
+
+    def __init__(self, name: str = 'discord.ext.flow') -> None:
+        self.tracer = None if otel_trace is None else otel_trace.get_tracer(name)
+
+    def start_span(
+        self, name: str, attributes: Mapping[str, AttributeValue] | None = None, parent: object = None
+    ) -> AbstractContextManager[object]:
+        """Start span as current span."""
+        if self.tracer is None or otel_trace is None:
+            return nullcontext()
+        context = None if parent is None else otel_trace.set_span_in_context(parent)
+        span: AbstractContextManager[object] = self.tracer.start_as_current_span(
+            name, context=context, attributes=attributes
+        )
+        return span
@@ -1,11 +1,21 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Protocol, TypedDict
+from asyncio import Future, Task, TimerHandle, get_running_loop
+from collections import OrderedDict
+from contextlib import suppress
+from typing import TYPE_CHECKING, Any, Protocol, TypedDict, cast
+from weakref import ref
 
-from discord import Interaction, Message
+from discord import HTTPException, Interaction, InteractionResponseType, InteractionType, Message
+from discord.utils import MISSING
+
+from .deletion import TOKEN_LIFETIME, default_scheduler
+from .metrics import default_ack_tracker
+from .observer import hooks
 
 if TYPE_CHECKING:
     from collections.abc import Callable, Sequence
+    from types import TracebackType
     from typing import Self, TypeVar
 
     from discord import AllowedMentions, Attachment, Client, Embed, File
@@ -13,6 +23,7 @@ if TYPE_CHECKING:
     from discord.ui import View
 
     from .model import Message as MessageData, MessageKwargs
+    from .tracing import Tracer
     from .view import _View
 
     T = TypeVar('T')
@@ -35,6 +46,8 @@ def map_or(value: T | None, default: U, func: Callable[[T], V]) -> V | U:
 
 
 class _Editable(Protocol):
+    id: int
+
     async def edit(
         self,
         *,
@@ -48,6 +61,45 @@ class _Editable(Protocol):
         ...
 
 
+class _OriginalResponse:
+    """Original response of interaction. This is edited by the interaction token, without fetching the message.
+
+    The message is fetched only by `fetch`.
+    """
+
+    __slots__ = ('id', 'interaction', 'message')
+
+    def __init__(self, interaction: Interaction[Client], message_id: int) -> None:
+        self.interaction = interaction
+        self.id = message_id
+        self.message: Message | None = None
+
+    async def edit(
+        self,
+        *,
+        content: str | None = MISSING,
+        embeds: Sequence[Embed] | None = MISSING,
+        attachments: Sequence[Attachment | File] | None = MISSING,
+        view: View | None = MISSING,
+        allowed_mentions: AllowedMentions | None = MISSING,
+    ) -> Self:
+        """Edit the original response."""
+        self.message = await self.interaction.edit_original_response(
+            content=content,
+            embeds=unwrap_or(embeds, ()),
+            attachments=unwrap_or(attachments, ()),
+            view=view,
+            allowed_mentions=allowed_mentions,
+        )
+        return self
+
+    async def fetch(self) -> Message:
+        """Return the message of the original response. It is fetched if not edited yet."""
+        if self.message is None:
+            self.message = await self.interaction.original_response()
+        return self.message
+
+
 class _SendHelperKWType(TypedDict, total=False):
     content: str
     tts: bool
@@ -105,43 +157,325 @@ def into_edit_kwargs(kwargs: MessageKwargs) -> _EditKWType:
     return kw
 
 
+class _PayloadCache:
+    """Remember the last payload sent per message by a flow, and compute the fields which differ from it.
+
+    Payloads are recorded only after they are sent successfully. Edits by others are not known, so a cache is kept
+    per controller, for messages of its flow only.
+    """
+
+    def __init__(self, maxsize: int = 64) -> None:
+        self.maxsize = maxsize
+        self.payloads: OrderedDict[int, dict[str, object]] = OrderedDict()
+
+    @staticmethod
+    def _comparable(name: str, value: Any) -> object:  # noqa: ANN401
+        match name:
+            case 'embeds':
+                return tuple(embed.to_dict() for embed in value)
+            case 'view':
+                # same components with other item objects must be sent again, to route interactions to new items.
+                return (ref(value), tuple(ref(child) for child in value.children), value.to_components())
+            case 'attachments':
+                # files can not be compared. always send them.
+                return object()
+            case _:
+                return value
+
+    def record(self, key: int, kwargs: _EditKWType) -> None:
+        """Remember payload which is sent to message successfully."""
+        current = {name: self._comparable(name, value) for name, value in kwargs.items() if name != 'allowed_mentions'}
+        self.payloads[key] = self.payloads.get(key, {}) | current
+        self.payloads.move_to_end(key)
+        while len(self.payloads) > self.maxsize:
+            self.payloads.popitem(last=False)
+
+    def diff(self, key: int, kwargs: _EditKWType) -> _EditKWType:
+        """Return fields which differ from the last payload recorded for message."""
+        if (last := self.payloads.get(key)) is None:
+            return kwargs
+        changed: dict[str, object] = {
+            name: value
+            for name, value in kwargs.items()
+            if name != 'allowed_mentions' and last.get(name) != self._comparable(name, value)
+        }
+        if 'content' in changed and 'allowed_mentions' in kwargs:
+            changed['allowed_mentions'] = kwargs['allowed_mentions']
+        return cast('_EditKWType', changed)
+
+
+def _changed(payloads: _PayloadCache | None, key: int, kwargs: _EditKWType, diff: bool) -> _EditKWType:
+    return payloads.diff(key, kwargs) if diff and payloads is not None else kwargs
+
+
+def _record(payloads: _PayloadCache | None, key: int, kwargs: _EditKWType) -> None:
+    # recorded even if not diffed, so that the next diffed edit knows what the message has.
+    if payloads is not None:
+        payloads.record(key, kwargs)
+
+
+class _CoalescedEdit:
+    def __init__(self) -> None:
+        self.latest: tuple[Interaction[Client], _EditKWType, Task[object]] | None = None
+        self.waiters: list[Future[_Editable]] = []
+
+    def resolve(self, waiters: list[Future[_Editable]], result: _Editable | BaseException) -> None:
+        for waiter in waiters:
+            if waiter.done():
+                continue
+            if isinstance(result, BaseException):
+                waiter.set_exception(result)
+            else:
+                waiter.set_result(result)
+
+
+class _EditCoalescer:
+    """Collapse edits of the same message. only the latest edit is sent while another edit is in flight."""
+
+    def __init__(self) -> None:
+        self.edits: dict[int, _CoalescedEdit] = {}
+
+    async def _follow(self, state: _CoalescedEdit, interaction: Interaction[Client], kwargs: _EditKWType) -> _Editable:
+        # edit is in flight. the latest payload is sent after it, so register before awaiting anything.
+        # otherwise the edit in flight may finish while deferring, and nobody sends this payload.
+        loop = get_running_loop()
+        deferring: Task[object] = loop.create_task(interaction.response.defer())
+        waiter: Future[_Editable] = loop.create_future()
+        state.latest = (interaction, kwargs, deferring)
+        state.waiters.append(waiter)
+        try:
+            await deferring
+            default_ack_tracker.observe(interaction)
+        except BaseException:
+            if state.latest is not None and state.latest[2] is deferring:
+                state.latest = None
+            if waiter in state.waiters:
+                state.waiters.remove(waiter)
+            waiter.cancel()
+            raise
+        return await waiter
+
+    async def edit(
+        self, interaction: Interaction[Client], kwargs: _EditKWType, payloads: _PayloadCache | None, diff: bool
+    ) -> _Editable:
+        assert interaction.message is not None
+        key = interaction.message.id
+        if (state := self.edits.get(key)) is not None:
+            return await self._follow(state, interaction, kwargs)
+
+        state = self.edits[key] = _CoalescedEdit()
+        try:
+            result: _Editable = await _edit_interaction(interaction, kwargs, payloads, diff)
+            while state.latest is not None:
+                (interaction, kwargs, deferring), state.latest = state.latest, None
+                waiters, state.waiters = state.waiters, []
+                try:
+                    # the interaction must be acknowledged before editing by its token.
+                    await deferring
+                except HTTPException:
+                    # the interaction which failed to defer raises it. superseded edits keep the last result.
+                    state.resolve(waiters, result)
+                    continue
+                try:
+                    if changed := _changed(payloads, key, kwargs, diff):
+                        result = await _OriginalResponse(interaction, key).edit(**changed)
+                except BaseException as e:
+                    state.resolve(waiters, e)
+                    raise
+                _record(payloads, key, kwargs)
+                state.resolve(waiters, result)
+        except BaseException as e:
+            state.resolve(state.waiters, e)
+            raise
+        else:
+            return result
+        finally:
+            del self.edits[key]
+
+
+_coalescer = _EditCoalescer()
+
+
+class _AutoDefer:
+    """Defer interaction if the with block takes longer than budget, to keep the interaction token alive.
+
+    After deferring, send_helper edits the original response or sends followup instead of responding.
+    """
+
+    def __init__(self, messageable: object, budget: float | None) -> None:
+        # only interactions of messages are deferred, as update of the message. deferring others creates
+        # a public "thinking" response, and the ephemeral message sent after it would be public.
+        self.interaction = (
+            messageable
+            if budget is not None
+            and isinstance(messageable, Interaction)
+            and messageable.type in (InteractionType.component, InteractionType.modal_submit)
+            and messageable.message is not None
+            else None
+        )
+        self.budget = budget
+        self.handle: TimerHandle | None = None
+        self.task: Task[None] | None = None
+
+    async def __aenter__(self) -> None:
+        if self.interaction is not None and self.budget is not None:
+            self.handle = get_running_loop().call_later(self.budget, self._fire)
+
+    def _fire(self) -> None:
+        self.handle = None
+        self.task = get_running_loop().create_task(self._defer())
+
+    async def _defer(self) -> None:
+        assert self.interaction is not None
+        if self.interaction.response.is_done():
+            return
+        # the interaction may be responded by the callback at the same time.
+        with suppress(HTTPException):
+            await self.interaction.response.defer()
+            default_ack_tracker.observe(self.interaction)
+
+    async def __aexit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None
+    ) -> None:
+        if self.handle is not None:
+            self.handle.cancel()
+        if self.task is not None:
+            # wait for deferring, not to respond twice.
+            await self.task
+
+
+async def _edit_interaction(
+    interaction: Interaction[Client], kwargs: _EditKWType, payloads: _PayloadCache | None, diff: bool
+) -> _Editable:
+    assert interaction.message is not None
+    if not (changed := _changed(payloads, interaction.message.id, kwargs, diff)):
+        # nothing changed. only acknowledge interaction.
+        await interaction.response.defer()
+    else:
+        await interaction.response.edit_message(**changed)
+    default_ack_tracker.observe(interaction)
+    _record(payloads, interaction.message.id, kwargs)
+    return _OriginalResponse(interaction, interaction.message.id)
+
+
+async def _edit_helper(
+    messageable: Messageable | Interaction[Client],
+    kwargs: MessageKwargs,
+    view: _View | None,
+    edit_target: _Editable | None,
+) -> _Editable | None:
+    payloads = None if view is None else view.payloads
+    diff = view is not None and view.config.get('diff_edits', False)
+    edit_kwargs = into_edit_kwargs(kwargs)
+    edited: _Editable
+    if isinstance(messageable, Interaction) and not messageable.response.is_done():
+        if messageable.message is not None:  # Interaction.message is not None -> can edit
+            if view is not None and view.config.get('coalesce_edits', False):
+                return await _coalescer.edit(messageable, edit_kwargs, payloads, diff)
+            return await _edit_interaction(messageable, edit_kwargs, payloads, diff)
+        return None
+    if edit_target is not None:
+        changed = _changed(payloads, edit_target.id, edit_kwargs, diff)
+        edited = await edit_target.edit(**changed) if changed else edit_target
+    elif (
+        isinstance(messageable, Interaction)
+        and messageable.message is not None
+        and messageable.response.type is InteractionResponseType.deferred_message_update
+    ):
+        # deferred component interaction. the message of component is the original response.
+        # edit is needed to get the message, even if nothing changed.
+        changed = _changed(payloads, messageable.message.id, edit_kwargs, diff) or edit_kwargs
+        edited = await _OriginalResponse(messageable, messageable.message.id).edit(**changed)
+    else:
+        return None
+    _record(payloads, edited.id, edit_kwargs)
+    return edited
+
+
+def _schedule_response_deletion(
+    interaction: Interaction[Client], message_id: int, delay: float, *, ephemeral: bool, original: bool
+) -> None:
+    # the token works anywhere, even where the bot can not access the channel, such as user-installed apps.
+    # after the token expires, messages can be deleted only through the channel, by the bot which is in it.
+    if (
+        delay > TOKEN_LIFETIME - default_scheduler.resolution
+        and not ephemeral
+        and (channel := interaction.channel) is not None
+        and interaction.is_guild_integration()
+        and interaction.app_permissions.view_channel
+    ):
+        default_scheduler.schedule(delay, message_id, channel.id, channel)
+    else:
+        default_scheduler.schedule_response(delay, interaction, message_id, original=original)
+
+
 async def send_helper(
     messageable: Messageable | Interaction[Client],
     message: MessageData,
     view: _View | None,
     edit_target: _Editable | None,
+    *,
+    tracer: Tracer | None = None,
 ) -> _Editable:
     """Helper function to send message. use messageable or interaction."""
+    if tracer is None:
+        sent = await _send_helper(messageable, message, view, edit_target)
+    else:
+        attributes: dict[str, str | bool] = {
+            'flow.edit_original': message.edit_original,
+            'flow.interaction': isinstance(messageable, Interaction),
+        }
+        with tracer.start_span('flow.send', attributes):
+            sent = await _send_helper(messageable, message, view, edit_target)
+    for hook in hooks.message_sent:
+        hook(messageable, message, sent)
+    return sent
+
+
+async def _send_helper(
+    messageable: Messageable | Interaction[Client],
+    message: MessageData,
+    view: _View | None,
+    edit_target: _Editable | None,
+) -> _Editable:
     kwargs = message._to_dict()
     if view is not None:
         kwargs['view'] = view
-
     # if edit
-    if message.edit_original:
-        if isinstance(messageable, Interaction) and not messageable.response.is_done():
-            if messageable.message is not None:  # Interaction.message is not None -> can edit
-                await messageable.response.edit_message(**into_edit_kwargs(kwargs))
-                return await messageable.original_response()  # type: ignore[reportReturnType, return-value]
-        elif edit_target is not None:
-            return await edit_target.edit(**into_edit_kwargs(kwargs))
-        # fallback to send message
+    if message.edit_original and (edited := await _edit_helper(messageable, kwargs, view, edit_target)) is not None:
+        return edited
+    # fallback to send message
 
     # if send
-    msg: Message
+    msg: _Editable
+    followup = None
     delete_after = kwargs.get('delete_after', None)
     ephemeral = kwargs.get('ephemeral', False)
+    edit_kwargs = into_edit_kwargs(kwargs)
     kwargs = into_send_kwargs(kwargs)
     if isinstance(messageable, Interaction):
         if messageable.response.is_done():
-            msg = await messageable.followup.send(wait=True, ephemeral=ephemeral, **kwargs)
+            followup = await messageable.followup.send(wait=True, ephemeral=ephemeral, **kwargs)
+            # type-ignore: WebhookMessage is _Editable
+            msg = followup  # type: ignore[reportAssignmentType, assignment]
         else:
-            await messageable.response.send_message(ephemeral=ephemeral, **kwargs)
-            msg = await messageable.original_response()
-
+            callback = await messageable.response.send_message(ephemeral=ephemeral, **kwargs)
+            default_ack_tracker.observe(messageable)
+            # discord.py < 2.5 does not return the callback response, so the message must be fetched for its ID.
+            if (message_id := getattr(callback, 'message_id', None)) is None:
+                msg = _OriginalResponse(messageable, 0)
+                msg.id = (await msg.fetch()).id
+            else:
+                msg = _OriginalResponse(messageable, message_id)
         if delete_after is not None:
-            await msg.delete(delay=delete_after)
+            _schedule_response_deletion(
+                messageable, msg.id, delete_after, ephemeral=ephemeral, original=followup is None
+            )
     else:
-        # type-ignore: can pass None to delete_after
-        msg = await messageable.send(delete_after=delete_after, **kwargs)  # type: ignore[reportArgumentType, arg-type]
-    # type-ignore: return type is Message, InteractionMessage or WebhookMessage, which are also _Editable
-    return msg  # type: ignore[reportReturnType, return-value]
+        sent = await messageable.send(**kwargs)
+        if delete_after is not None:
+            default_scheduler.schedule(delete_after, sent.id, sent.channel.id, sent.channel)
+        # type-ignore: Message is _Editable
+        msg = sent  # type: ignore[reportAssignmentType, assignment]
+    _record(None if view is None else view.payloads, msg.id, edit_kwargs)
+    return msg
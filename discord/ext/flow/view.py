@@ -1,21 +1,64 @@
 from __future__ import annotations
 
-from asyncio import CancelledError
-from contextlib import suppress
-from typing import TYPE_CHECKING
+from asyncio import CancelledError, Event, TimerHandle, get_running_loop
+from contextlib import AbstractContextManager, contextmanager, nullcontext, suppress
+from typing import TYPE_CHECKING, Any, TypeVar
 
 from discord import Client, Interaction, ui
-from discord.utils import MISSING, maybe_coroutine
+from discord.utils import MISSING
 
+from .executor import default_executor
+from .metrics import default_ack_tracker
 from .model import Button, ChannelSelect, Link, MentionableSelect, RoleSelect, Select, UserSelect
+from .observer import hooks
 from .result import _ResultTypeEnum
-from .util import map_or, send_helper, unwrap_or
+from .util import _AutoDefer, map_or, send_helper, unwrap_or
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Callable, Iterator, Sequence
+    from typing import Self
 
+    from discord.utils import MaybeAwaitable
+
+    from .controller import Controller
     from .model import ItemType, ModelBase, ViewConfig
     from .result import Result
+    from .router import InteractionRouter
+    from .util import _Editable, _PayloadCache
+
+
+__all__ = ('register_item',)
+
+C = TypeVar('C')
+
+_factories: dict[type[Any], Callable[[Any], ui.Item[Any]]] = {}
+# factories resolved by MRO of config types, including types registered explicitly.
+_resolved: dict[type[Any], Callable[[Any], ui.Item[Any]]] = {}
+
+
+def register_item(config_type: type[C], factory: Callable[[C], ui.Item[Any]]) -> None:
+    """Register factory of discord.ui.Item for item config type, so that the config can be used in Message.items.
+
+    Subclasses of config_type use the same factory unless registered separately.
+    To be updated in place by `reuse_items` view config, the item must have `config` attribute and `update` method.
+
+    Args:
+        config_type (type[C]): type of item config.
+        factory (Callable[[C], ui.Item[Any]]): function which builds item from config, such as item class.
+    """
+    _factories[config_type] = factory
+    # subclasses may resolve to this factory now. factories registered for them are kept.
+    _resolved.clear()
+
+
+def _get_factory(config_type: type[Any]) -> Callable[[Any], ui.Item[Any]]:
+    if (factory := _resolved.get(config_type)) is not None:
+        return factory
+    for base in config_type.__mro__:
+        if (factory := _factories.get(base)) is not None:
+            _resolved[config_type] = factory
+            return factory
+    raise TypeError(f'{config_type.__qualname__} is not an item type. register it by register_item.')
 
 
 class _Button(ui.Button['_View']):
@@ -32,20 +75,36 @@ class _Button(ui.Button['_View']):
         )
         self.config = config
 
+    def update(self, config: Button) -> None:
+        self.label = config.label
+        if config.custom_id is not None:
+            self.custom_id = config.custom_id
+        self.disabled = config.disabled
+        self.style = config.style
+        self.emoji = config.emoji
+        self.config = config
+
     async def callback(self, interaction: Interaction[Client]) -> None:
-        with suppress(CancelledError):
-            await self.view.set_result(await maybe_coroutine(self.config.callback, interaction), interaction)
+        await self.view.run_callback(interaction, self.config.callback)
 
 
 class _Link(ui.Button['_View']):
     def __init__(self, config: Link) -> None:
         super().__init__(label=config.label, disabled=config.disabled, emoji=config.emoji, row=config.row)
+        self.config = config
+
+    def update(self, config: Link) -> None:
+        self.label = config.label
+        self.disabled = config.disabled
+        self.emoji = config.emoji
+        self.config = config
 
 
 class _Select(ui.Select['_View']):
     view: _View
 
     def __init__(self, config: Select) -> None:
+        # options are copied for each item, because discord.py keeps the list.
         super().__init__(
             custom_id=unwrap_or(config.custom_id, MISSING),
             placeholder=config.placeholder,
@@ -57,11 +116,18 @@ class _Select(ui.Select['_View']):
         )
         self.config = config
 
+    def update(self, config: Select) -> None:
+        if config.custom_id is not None:
+            self.custom_id = config.custom_id
+        self.placeholder = config.placeholder
+        self.min_values = config.min_values
+        self.max_values = config.max_values
+        self.disabled = config.disabled
+        self.options = map_or(config.options, [], list)
+        self.config = config
+
     async def callback(self, interaction: Interaction[Client]) -> None:
-        with suppress(CancelledError):
-            await self.view.set_result(
-                await maybe_coroutine(self.config.callback, interaction, self.values), interaction
-            )
+        await self.view.run_callback(interaction, self.config.callback, self.values)
 
 
 class _UserSelect(ui.UserSelect['_View']):
@@ -79,11 +145,18 @@ class _UserSelect(ui.UserSelect['_View']):
         )
         self.config = config
 
+    def update(self, config: UserSelect) -> None:
+        if config.custom_id is not None:
+            self.custom_id = config.custom_id
+        self.placeholder = config.placeholder
+        self.min_values = config.min_values
+        self.max_values = config.max_values
+        self.disabled = config.disabled
+        self.default_values = unwrap_or(config.default_values, [])
+        self.config = config
+
     async def callback(self, interaction: Interaction[Client]) -> None:
-        with suppress(CancelledError):
-            await self.view.set_result(
-                await maybe_coroutine(self.config.callback, interaction, self.values), interaction
-            )
+        await self.view.run_callback(interaction, self.config.callback, self.values)
 
 
 class _RoleSelect(ui.RoleSelect['_View']):
@@ -101,11 +174,18 @@ class _RoleSelect(ui.RoleSelect['_View']):
         )
         self.config = config
 
+    def update(self, config: RoleSelect) -> None:
+        if config.custom_id is not None:
+            self.custom_id = config.custom_id
+        self.placeholder = config.placeholder
+        self.min_values = config.min_values
+        self.max_values = config.max_values
+        self.disabled = config.disabled
+        self.default_values = unwrap_or(config.default_values, [])
+        self.config = config
+
     async def callback(self, interaction: Interaction[Client]) -> None:
-        with suppress(CancelledError):
-            await self.view.set_result(
-                await maybe_coroutine(self.config.callback, interaction, self.values), interaction
-            )
+        await self.view.run_callback(interaction, self.config.callback, self.values)
 
 
 class _MentionableSelect(ui.MentionableSelect['_View']):
@@ -123,11 +203,18 @@ class _MentionableSelect(ui.MentionableSelect['_View']):
         )
         self.config = config
 
+    def update(self, config: MentionableSelect) -> None:
+        if config.custom_id is not None:
+            self.custom_id = config.custom_id
+        self.placeholder = config.placeholder
+        self.min_values = config.min_values
+        self.max_values = config.max_values
+        self.disabled = config.disabled
+        self.default_values = unwrap_or(config.default_values, [])
+        self.config = config
+
     async def callback(self, interaction: Interaction[Client]) -> None:
-        with suppress(CancelledError):
-            await self.view.set_result(
-                await maybe_coroutine(self.config.callback, interaction, self.values), interaction
-            )
+        await self.view.run_callback(interaction, self.config.callback, self.values)
 
 
 class _ChannelSelect(ui.ChannelSelect['_View']):
@@ -145,39 +232,156 @@ class _ChannelSelect(ui.ChannelSelect['_View']):
         )
         self.config = config
 
+    def update(self, config: ChannelSelect) -> None:
+        if config.custom_id is not None:
+            self.custom_id = config.custom_id
+        self.placeholder = config.placeholder
+        self.min_values = config.min_values
+        self.max_values = config.max_values
+        self.disabled = config.disabled
+        self.default_values = unwrap_or(config.default_values, [])
+        self.config = config
+
     async def callback(self, interaction: Interaction[Client]) -> None:
-        with suppress(CancelledError):
-            await self.view.set_result(
-                await maybe_coroutine(self.config.callback, interaction, self.values), interaction
-            )
+        await self.view.run_callback(interaction, self.config.callback, self.values)
+
+
+register_item(Button, _Button)
+register_item(Link, _Link)
+register_item(Select, _Select)
+register_item(UserSelect, _UserSelect)
+register_item(RoleSelect, _RoleSelect)
+register_item(MentionableSelect, _MentionableSelect)
+register_item(ChannelSelect, _ChannelSelect)
 
 
 class _View(ui.View):
     result: tuple[ModelBase, Interaction[Client]] | None = None
     config: ViewConfig
-
-    def __init__(self, config: ViewConfig, items: Sequence[ItemType]) -> None:
+    items_disabled: bool = False
+    in_flight: int = 0
+    _idle: Event | None = None
+
+    def __init__(
+        self,
+        config: ViewConfig,
+        items: Sequence[ItemType],
+        *,
+        model: ModelBase | None = None,
+        controller: Controller | None = None,
+        span: object = None,
+    ) -> None:
         super().__init__(timeout=config.get('timeout'))
         self.config = config
+        self.model = model
+        self.metrics = None if controller is None else controller.metrics
+        self.tracer = None if controller is None else controller.tracer
+        self.defer_budget = None if controller is None else controller.auto_defer
+        self.payloads: _PayloadCache | None = None if controller is None else controller._payloads
+        self.span = span
         self.set_items(items)
 
+    def measure(self, phase: str) -> AbstractContextManager[None]:
+        if self.metrics is None or self.model is None:
+            return nullcontext()
+        return self.metrics.measure(self.model, phase)
+
+    def auto_defer(self, interaction: Interaction[Client]) -> _AutoDefer:
+        return _AutoDefer(interaction, self.defer_budget)
+
+    async def run_callback(
+        self,
+        interaction: Interaction[Client],
+        callback: Callable[..., MaybeAwaitable[Result]],
+        *args: Any,  # noqa: ANN401
+    ) -> None:
+        for hook in hooks.interaction_received:
+            hook(self.model, interaction)
+        # responses of this lib are observed when sent. the callback may respond by itself.
+        default_ack_tracker.watch(interaction)
+        with suppress(CancelledError):
+            try:
+                async with self.auto_defer(interaction):
+                    with self.measure('callback'), self.trace('flow.callback'):
+                        result = await default_executor.run(callback, interaction, *args)
+            finally:
+                # interactions of the callback and of modals which are responded by the callback.
+                default_ack_tracker.flush()
+            for hook in hooks.callback_finished:
+                hook(self.model, interaction, result)
+            await self.set_result(result, interaction)
+
+    async def on_timeout(self) -> None:
+        for hook in hooks.view_timed_out:
+            hook(self.model)
+
+    def trace(self, name: str) -> AbstractContextManager[object]:
+        if self.tracer is None:
+            return nullcontext()
+        return self.tracer.start_span(name, {'flow.model': type(self.model).__qualname__}, parent=self.span)
+
+    @contextmanager
+    def dispatching(self) -> Iterator[None]:
+        """Count callbacks running in with block as in flight."""
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self.in_flight == 0 and self._idle is not None:
+                self._idle.set()
+
+    async def wait_idle(self) -> None:
+        """Wait until no callback is in flight."""
+        while self.in_flight:
+            if self._idle is None:
+                self._idle = Event()
+            self._idle.clear()
+            await self._idle.wait()
+
+    async def _scheduled_task(self, item: ui.Item[Any], interaction: Interaction[Client]) -> None:
+        with self.dispatching():
+            await super()._scheduled_task(item, interaction)  # type: ignore[reportUnknownMemberType, no-untyped-call]
+
+    def disable_items(self) -> None:
+        """Disable all children. The message must be edited to apply this."""
+        self.items_disabled = True
+        for child in self.children:
+            child.disabled = True  # type: ignore[reportGeneralTypeIssues, attr-defined]
+
+    def reuse_items(self, items: Sequence[ItemType]) -> bool:
+        """Update children in place if they have the same layout as items.
+
+        Children are matched with items by position. Item types, rows and custom_ids (if set) must be same.
+
+        Returns:
+            bool: True if children are updated. False if nothing changed because layout is different.
+        """
+        children = self.children
+        if len(children) != len(items):
+            return False
+        for child, item in zip(children, items, strict=True):
+            config = getattr(child, 'config', None)
+            if (
+                type(config) is not type(item)
+                or child.row != getattr(item, 'row', None)
+                or not hasattr(child, 'update')
+            ):
+                return False
+            custom_id = getattr(item, 'custom_id', None)
+            if custom_id is not None and custom_id != getattr(child, 'custom_id', None):
+                return False
+        for child, item in zip(children, items, strict=True):
+            # type-ignore: child and item have same type.
+            child.update(item)  # type: ignore[reportAttributeAccessIssue, attr-defined]
+        return True
+
+    def bind_message(self, message: _Editable) -> None:
+        """Called with the message which the view is sent to."""
+
     def set_items(self, items: Sequence[ItemType]) -> None:
         for item in items:
-            match item:
-                case Button(_):
-                    self.add_item(_Button(item))
-                case Link(_):
-                    self.add_item(_Link(item))
-                case Select(_):
-                    self.add_item(_Select(item))
-                case UserSelect(_):
-                    self.add_item(_UserSelect(item))
-                case RoleSelect(_):
-                    self.add_item(_RoleSelect(item))
-                case MentionableSelect(_):
-                    self.add_item(_MentionableSelect(item))
-                case ChannelSelect(_):
-                    self.add_item(_ChannelSelect(item))
+            self.add_item(_get_factory(type(item))(item))
 
     async def set_result(self, result: Result, interaction: Interaction[Client]) -> None:
         if result._interaction is not None:
@@ -186,9 +390,10 @@ class _View(ui.View):
             case _ResultTypeEnum.MESSAGE:
                 assert result._message is not None
                 msg = result._message
-                self.clear_items()
-                self.set_items(msg.items or ())
-                await send_helper(interaction, msg, self, None)
+                if not (self.config.get('reuse_items', False) and self.reuse_items(msg.items or ())):
+                    self.clear_items()
+                    self.set_items(msg.items or ())
+                self.bind_message(await send_helper(interaction, msg, self, None, tracer=self.tracer))
                 if not msg.items:
                     self.stop()
             case _ResultTypeEnum.MODEL:
@@ -200,3 +405,70 @@ class _View(ui.View):
                     raise RuntimeError('Callback MUST consume interaction.')
                 if result._is_end:
                     self.stop()
+        for hook in hooks.result_applied:
+            hook(self.model, result._type, interaction)
+
+
+class _RoutedView(_View):
+    """View dispatched by InteractionRouter. This view is not stored in discord.py ViewStore."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        config: ViewConfig,
+        items: Sequence[ItemType],
+        *,
+        router: InteractionRouter,
+        model: ModelBase | None = None,
+        controller: Controller | None = None,
+        span: object = None,
+    ) -> None:
+        # router and message_id are used by set_items in super().__init__.
+        self.router = router
+        self.message_id: int | None = None
+        self._timeout_handle: TimerHandle | None = None
+        super().__init__(config, items, model=model, controller=controller, span=span)
+        self.refresh_timeout()
+
+    def is_finished(self) -> bool:
+        # discord.py stores only unfinished views. interactions are dispatched by router instead.
+        return True
+
+    def is_stopped(self) -> bool:
+        return super().is_finished()
+
+    def refresh_timeout(self) -> None:
+        if self._timeout_handle is not None:
+            self._timeout_handle.cancel()
+        if self.timeout is not None and not self.is_stopped():
+            self._timeout_handle = get_running_loop().call_later(self.timeout, self._on_router_timeout)
+
+    def _on_router_timeout(self) -> None:
+        self._timeout_handle = None
+        self.router.remove(self)
+        self._dispatch_timeout()  # type: ignore[reportUnknownMemberType, no-untyped-call]
+
+    def bind_message(self, message: _Editable) -> None:
+        # the view may be sent to a new message. interactions of the old message are not routed anymore.
+        self.router.bind(self, message.id)
+
+    def set_items(self, items: Sequence[ItemType]) -> None:
+        super().set_items(items)
+        self.router.add(self)
+
+    def clear_items(self) -> Self:
+        self.router.remove(self)
+        return super().clear_items()
+
+    def reuse_items(self, items: Sequence[ItemType]) -> bool:
+        # custom_id of items may be changed.
+        self.router.remove(self)
+        reused = super().reuse_items(items)
+        self.router.add(self)
+        return reused
+
+    def stop(self) -> None:
+        super().stop()
+        if self._timeout_handle is not None:
+            self._timeout_handle.cancel()
+            self._timeout_handle = None
+        self.router.remove(self)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from os import getenv
+
+from discord import Client, Intents, Interaction
+from discord.app_commands import CommandTree
+from discord.ext.flow import Button, Controller, Message, PersistentModel, Result, setup_persistent
+
+
+class Counter(PersistentModel, key='counter'):
+    def __init__(self, count: int) -> None:
+        self.count = count
+
+    def dump_state(self) -> str:
+        return str(self.count)
+
+    @classmethod
+    def load_state(cls, state: str) -> Counter:
+        return cls(int(state))
+
+    def message(self) -> Message:
+        return Message(
+            content=f'count: {self.count}',
+            items=(
+                self.button(-1),
+                self.button(1),
+            ),
+            edit_original=True,
+        )
+
+    def button(self, value: int) -> Button:
+        def inner(_: Interaction[Client]) -> Result:
+            return Result.next_model(Counter(self.count + value))
+
+        return Button(label=f'{value:+}', callback=inner)
+
+
+class MyClient(Client):
+    def __init__(self) -> None:
+        super().__init__(intents=Intents.default())
+        self.tree = CommandTree(self)
+
+    async def setup_hook(self) -> None:
+        setup_persistent(self)
+        await self.tree.sync()
+
+
+client = MyClient()
+
+
+@client.event
+async def on_ready() -> None:
+    assert client.user is not None
+    print(f'Logged in as {client.user} (ID: {client.user.id})')
+    print('------')
+
+
+@client.tree.command(name='counter')
+async def counter(interaction: Interaction[Client]) -> None:
+    await Controller(Counter(0)).invoke(interaction)
+
+
+client.run(getenv('TOKEN', ''))
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from asyncio import create_task, run, sleep, wait_for
+from typing import TYPE_CHECKING
+
+from discord.ext.flow import Button, Controller, Message, ModelBase, Result, default_ack_tracker
+from discord.ext.flow.testing import FakeInteraction, FakeTransport, click, wait_for_view
+
+if TYPE_CHECKING:
+    from discord import Client, Interaction
+
+THRESHOLD = 0.05
+
+
+class Done(ModelBase):
+    async def before_invoke(self) -> None:
+        # longer than auto_defer of the controller.
+        await sleep(0.03)
+
+    def message(self) -> Message:
+        return Message(content='done', edit_original=True)
+
+
+class Start(ModelBase):
+    def message(self) -> Message:
+        async def respond_then_work(interaction: Interaction[Client]) -> Result:
+            await interaction.response.send_message('working')
+            await sleep(THRESHOLD * 2)
+            return Result.continue_flow()
+
+        async def next_model(_: Interaction[Client]) -> Result:
+            return Result.next_model(Done())
+
+        return Message(
+            content='start',
+            items=(Button(label='work', callback=respond_then_work), Button(label='next', callback=next_model)),
+        )
+
+
+async def click_both() -> tuple[int, int]:
+    default_ack_tracker.threshold = THRESHOLD
+    count, slow = default_ack_tracker.count, default_ack_tracker.slow
+    interaction = FakeInteraction(FakeTransport())
+    flow = create_task(Controller(Start(), auto_defer=0.01).invoke(interaction))
+    message = await wait_for_view(interaction)
+    await click(message, 0)
+    await click(message, 1)
+    await wait_for(flow, 1.0)
+    return default_ack_tracker.count - count, default_ack_tracker.slow - slow
+
+
+def test_ack_is_observed_when_responded() -> None:
+    # the first response, the work button and the next button which is deferred by the controller.
+    assert run(click_both()) == (3, 0)
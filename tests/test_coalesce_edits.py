@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from asyncio import create_task, gather, run, sleep, wait_for
+from typing import TYPE_CHECKING
+
+from discord.ext.flow import Button, Controller, Message, ModelBase, Result
+from discord.ext.flow.testing import FakeInteraction, FakeTransport, click, wait_for_view
+
+if TYPE_CHECKING:
+    from discord import Client, Interaction
+    from discord.ext.flow import ViewConfig
+
+
+class Counter(ModelBase):
+    def __init__(self) -> None:
+        self.count = 0
+
+    def view_config(self) -> ViewConfig:
+        return {'coalesce_edits': True}
+
+    def render(self) -> Message:
+        async def increment(_: Interaction[Client]) -> Result:
+            self.count += 1
+            return Result.send_message(self.render())
+
+        return Message(
+            content=f'count {self.count}', items=(Button(label='+', callback=increment),), edit_original=True
+        )
+
+    def message(self) -> Message:
+        return self.render()
+
+
+async def click_while_editing() -> tuple[Counter, str | None]:
+    counter = Counter()
+    interaction = FakeInteraction(FakeTransport(latency=0.05))
+    flow = create_task(Controller(counter).invoke(interaction))
+    message = await wait_for_view(interaction)
+    first = create_task(click(message, 0))
+    await sleep(0.01)
+    # the first edit finishes while the second click is deferring.
+    await wait_for(gather(first, click(message, 0)), 2)
+    flow.cancel()
+    return counter, message.content
+
+
+def test_edit_finishing_while_follower_defers() -> None:
+    counter, content = run(click_while_editing())
+    assert counter.count == 2
+    assert content == 'count 2'
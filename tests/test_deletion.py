@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from asyncio import run, sleep
+from typing import TYPE_CHECKING
+
+from discord.ext.flow import DeletionScheduler
+from discord.ext.flow.testing import FakeMessageable
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+class LateScheduler(DeletionScheduler):
+    """Schedule a deletion while the last flush is running. the wheel flushes twice after the last tick."""
+
+    def __init__(self, channel: FakeMessageable, message_id: int) -> None:
+        super().__init__(resolution=0.01)
+        self.channel = channel
+        self.late = message_id
+        self.idle_flushes = 0
+
+    async def _flush(self) -> None:
+        await super()._flush()
+        if not self.pending:
+            self.idle_flushes += 1
+            if self.idle_flushes == 2:
+                self.schedule(0.01, self.late, self.channel.id, self.channel)
+
+
+async def schedule_while_flushing(path: Path) -> bool:
+    channel = FakeMessageable()
+    first, late = await channel.send('first'), await channel.send('late')
+    scheduler = LateScheduler(channel, late.id)
+    # type-ignore: the client is not used because channels are passed.
+    await scheduler.persist(None, path)  # type: ignore[arg-type]
+    scheduler.schedule(0.01, first.id, channel.id, channel)
+    await sleep(0.2)
+    scheduler.close()
+    return first.deleted and late.deleted
+
+
+def test_schedule_while_flushing(tmp_path: Path) -> None:
+    assert run(schedule_while_flushing(tmp_path / 'deletions.db'))
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from asyncio import create_task, run, wait_for
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+from discord.ext.flow import Button, Controller, Message, ModelBase, Result
+from discord.ext.flow.testing import FakeInteraction, FakeTransport, click, wait_for_view
+
+if TYPE_CHECKING:
+    from discord import Client, Interaction
+    from discord.ext.flow import ViewConfig
+
+
+class FailingTransport(FakeTransport):
+    """Fail the next call of name once."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.failing: str | None = None
+
+    async def request(self, name: str, kwargs: dict[str, Any]) -> None:
+        if name == self.failing:
+            self.failing = None
+            raise RuntimeError(name)
+        await super().request(name, kwargs)
+
+
+class Switch(ModelBase):
+    def __init__(self) -> None:
+        self.on = False
+
+    def view_config(self) -> ViewConfig:
+        return {'diff_edits': True}
+
+    def render(self) -> Message:
+        async def switch(_: Interaction[Client]) -> Result:
+            self.on = True
+            return Result.send_message(self.render())
+
+        async def finish(interaction: Interaction[Client]) -> Result:
+            await interaction.response.send_message('finished')
+            return Result.finish_flow()
+
+        return Message(
+            content='on' if self.on else 'off',
+            items=(Button(label='switch', callback=switch), Button(label='finish', callback=finish)),
+            edit_original=True,
+        )
+
+    def message(self) -> Message:
+        return self.render()
+
+
+async def retry_failed_edit() -> str | None:
+    transport = FailingTransport()
+    interaction = FakeInteraction(transport)
+    flow = create_task(Controller(Switch()).invoke(interaction))
+    message = await wait_for_view(interaction)
+    transport.failing = 'response.edit_message'
+    with pytest.raises(RuntimeError):
+        await click(message, 0)
+    # the failed payload is not recorded, so the retry sends it.
+    await click(message, 0)
+    content = message.content
+    await click(message, 1)
+    await wait_for(flow, 1.0)
+    return content
+
+
+def test_retry_failed_edit() -> None:
+    assert run(retry_failed_edit()) == 'on'
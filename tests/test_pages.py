@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from asyncio import create_task, run
+from typing import TYPE_CHECKING
+
+from discord.ext.flow import Controller, Message, ModelBase, Paginator, paginator
+from discord.ext.flow.testing import FakeInteraction, FakeTransport, click, wait_for_view
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+NEXT_PAGE = 3
+PER_PAGE = 10
+
+
+def build_page(values: tuple[int, ...], page: int, _: int | None) -> Message:
+    return Message(content=f'page {page} {values}')
+
+
+class Source:
+    def __init__(self) -> None:
+        self.calls: list[tuple[int, int]] = []
+
+    async def __call__(self, offset: int, limit: int) -> Sequence[int]:
+        self.calls.append((offset, limit))
+        return range(100)[offset : offset + limit]
+
+
+class Pages(ModelBase):
+    def __init__(self, source: Source) -> None:
+        self.source = source
+
+    @paginator
+    def message(self) -> Paginator[int]:
+        return Paginator.from_source(build_page, self.source, per_page=PER_PAGE)
+
+
+async def go_next(source: Source) -> str | None:
+    interaction = FakeInteraction(FakeTransport())
+    controller = Controller(Pages(source))
+    flow = create_task(controller.invoke(interaction))
+    message = await wait_for_view(interaction)
+    for _ in range(2):
+        await click(message, NEXT_PAGE)
+    await controller.stop()
+    await flow
+    return message.content
+
+
+def test_next_page_is_fetched_once() -> None:
+    source = Source()
+    assert run(go_next(source)) == f'page 2 {tuple(range(20, 30))}'
+    # each page is fetched with one more value to know whether the next page exists, and nothing else.
+    assert source.calls == [(0, PER_PAGE + 1), (10, PER_PAGE + 1), (20, PER_PAGE + 1)]
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from asyncio import create_task, gather, run
+from typing import TYPE_CHECKING
+
+from discord.ext.flow import Button, Controller, FlowRegistry, Message, ModelBase, Result
+from discord.ext.flow.testing import FakeInteraction, FakeTransport, click, wait_for_view
+
+if TYPE_CHECKING:
+    from discord import Client, Interaction
+
+USERS = 3
+
+
+class Shared(ModelBase):
+    def message(self) -> Message:
+        async def finish(interaction: Interaction[Client]) -> Result:
+            await interaction.response.send_message('finished')
+            return Result.finish_flow()
+
+        return Message(content='shared', items=(Button(label='finish', callback=finish),))
+
+
+async def invoke_shared() -> tuple[int, int, int]:
+    registry = FlowRegistry(max_flows_per_user=1)
+    # one controller serves several users at once.
+    controller = Controller(Shared(), registry=registry)
+    interactions = [FakeInteraction(FakeTransport(), user_id=user_id) for user_id in range(USERS)]
+    flows = [create_task(controller.invoke(interaction)) for interaction in interactions]
+    messages = [await wait_for_view(interaction) for interaction in interactions]
+    live = len(registry)
+    await gather(*(click(message, 0) for message in messages))
+    await gather(*flows)
+    return live, len(registry), registry.count(user_id=0)
+
+
+def test_shared_controller() -> None:
+    assert run(invoke_shared()) == (USERS, 0, 0)
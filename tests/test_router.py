@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from asyncio import create_task, run, wait_for
+from typing import TYPE_CHECKING
+
+from discord.ext.flow import Button, Controller, InteractionRouter, Message, ModelBase, Result
+from discord.ext.flow.testing import FakeInteraction, FakeTransport, click, wait_for_view
+
+if TYPE_CHECKING:
+    from discord import Client, Interaction
+
+
+class Mover(ModelBase):
+    def __init__(self) -> None:
+        self.finished = False
+
+    def message(self) -> Message:
+        async def finish(interaction: Interaction[Client]) -> Result:
+            self.finished = True
+            await interaction.response.send_message('finished')
+            return Result.finish_flow()
+
+        async def move(_: Interaction[Client]) -> Result:
+            # sent as a new message, not by editing the clicked message.
+            return Result.send_message(Message(content='moved', items=(Button(label='finish', callback=finish),)))
+
+        return Message(content='start', items=(Button(label='move', callback=move),))
+
+
+async def move_to_new_message() -> Mover:
+    mover = Mover()
+    router = InteractionRouter()
+    interaction = FakeInteraction(FakeTransport())
+    flow = create_task(Controller(mover, router=router).invoke(interaction))
+    moved = await click(await wait_for_view(interaction), 0)
+    assert moved.original is not None
+    assert moved.original.content == 'moved'
+    await click(moved.original, 0)
+    await wait_for(flow, 1.0)
+    assert len(router) == 0
+    return mover
+
+
+def test_route_new_message() -> None:
+    assert run(move_to_new_message()).finished
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from asyncio import create_task, run
+from typing import TYPE_CHECKING
+
+import pytest
+
+from discord.ext.flow import (
+    Button,
+    Controller,
+    MemoryFlowStore,
+    Message,
+    ModelBase,
+    Paginator,
+    Result,
+    SnapshotFlowStore,
+    paginator,
+)
+from discord.ext.flow.testing import FakeInteraction, FakeTransport, click, wait_for_view
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from discord import Client, Interaction
+
+NEXT_PAGE = 3
+
+
+def build_page(_: tuple[int, ...], page: int, __: int) -> Message:
+    return Message(content=f'page {page}')
+
+
+class Pages(ModelBase):
+    @paginator
+    def message(self) -> Paginator[int]:
+        return Paginator(build_page, range(30), per_page=5)
+
+
+class JumpingPages(ModelBase):
+    def __init__(self) -> None:
+        self.start_page = 0
+
+    @paginator
+    def message(self) -> Paginator[int]:
+        return Paginator(build_page, range(50), per_page=5, start_page=self.start_page)
+
+
+class Counter(ModelBase):
+    def __init__(self) -> None:
+        self.count = 0
+
+    def message(self) -> Message:
+        async def increment(interaction: Interaction[Client]) -> Result:
+            self.count += 1
+            await interaction.response.defer()
+            return Result.continue_flow()
+
+        return Message(content='counter', items=(Button(label='+', callback=increment),))
+
+
+async def paginate(store: MemoryFlowStore) -> str | None:
+    interaction = FakeInteraction(FakeTransport())
+    await Controller(Pages(), store).invoke(interaction)
+    assert interaction.original is not None
+    for _ in range(2):
+        await click(interaction.original, NEXT_PAGE)
+    return interaction.original.content
+
+
+async def count(store: MemoryFlowStore) -> int:
+    interaction = FakeInteraction(FakeTransport())
+    controller = Controller(Counter(), store)
+    await controller.invoke(interaction)
+    assert interaction.original is not None
+    for _ in range(2):
+        await click(interaction.original, 0)
+    model = await store.load(controller.flow_id)
+    assert isinstance(model, Counter)
+    return model.count
+
+
+async def jump_in_memory() -> str | None:
+    pages = JumpingPages()
+    interaction = FakeInteraction(FakeTransport())
+    controller = Controller(pages)
+    flow = create_task(controller.invoke(interaction))
+    await click(await wait_for_view(interaction), NEXT_PAGE)
+    await controller.stop()
+    await flow
+    pages.start_page = 7
+    return (await pages.message()).content
+
+
+def test_send_message_in_stored_flow() -> None:
+    assert run(paginate(MemoryFlowStore(name='test-pages'))) == 'page 2'
+
+
+def test_continue_saves_model() -> None:
+    assert run(count(MemoryFlowStore(name='test-counter'))) == 2
+
+
+def test_snapshot_rejects_invalid_flow_id(tmp_path: Path) -> None:
+    store = SnapshotFlowStore(tmp_path, name='test-snapshot')
+    assert run(store.load('../escape')) is None
+
+
+def test_start_page_wins_without_store() -> None:
+    assert run(jump_in_memory()) == 'page 7'
+
+
+def test_duplicate_store_name() -> None:
+    store = MemoryFlowStore(name='test-duplicate')
+    with pytest.raises(ValueError, match='already used'):
+        MemoryFlowStore(name='test-duplicate')
+    store.unregister()
+    MemoryFlowStore(name='test-duplicate').unregister()
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from asyncio import Event, create_task, run, sleep, wait_for
+from typing import TYPE_CHECKING
+
+from discord.ext.flow import Button, Controller, Message, ModelBase, Result
+from discord.ext.flow.testing import FakeInteraction, FakeTransport, click, wait_for_view
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from discord import Client, Interaction
+
+
+class Slow(ModelBase):
+    def __init__(self) -> None:
+        self.started = Event()
+        self.prepared = False
+
+    async def before_invoke(self) -> None:
+        self.started.set()
+        await sleep(0.05)
+        self.prepared = True
+
+    def message(self) -> Message:
+        return Message(content='slow')
+
+
+class Start(ModelBase):
+    def __init__(self) -> None:
+        self.slow = Slow()
+
+    def successors(self) -> Sequence[ModelBase]:
+        return (self.slow,)
+
+    def message(self) -> Message:
+        async def finish(interaction: Interaction[Client]) -> Result:
+            await interaction.response.send_message('finished')
+            return Result.finish_flow()
+
+        return Message(content='start', items=(Button(label='finish', callback=finish),))
+
+
+async def finish_while_warming() -> Slow:
+    start = Start()
+    interaction = FakeInteraction(FakeTransport())
+    flow = create_task(Controller(start).invoke(interaction))
+    message = await wait_for_view(interaction)
+    await start.slow.started.wait()
+    await click(message, 0)
+    await wait_for(flow, 1.0)
+    await sleep(0.1)
+    return start.slow
+
+
+def test_cancel_unused_successors() -> None:
+    assert not run(finish_while_warming()).prepared